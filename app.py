@@ -10,6 +10,9 @@ import sys
 
 from src.rag_chatbot import RAGChatbot
 from src.document_loader import DocumentLoader
+from src.config import chatbot_settings, conversation_settings, load_config, setting
+from src.ingest_worker import IngestWorker
+from src.conversation import ConversationMemory
 
 # Configure logging
 logger.remove()
@@ -323,20 +326,15 @@ def initialize_chatbot():
     """Initialize chatbot (cached to avoid reloading)"""
     load_dotenv()
     
-    api_key = os.getenv('NVIDIA_API_KEY')
-    api_url = os.getenv('NVIDIA_API_URL')
-    model_name = os.getenv('NVIDIA_MODEL', 'openai/gpt-oss-20b')
+    # Environment variables override config/config.yaml
+    settings = chatbot_settings(load_config())
     
-    if not api_key or not api_url:
+    if not settings['nvidia_api_key'] or not settings['nvidia_api_url']:
         st.error("❌ Missing NVIDIA API credentials in .env file")
         st.stop()
     
     try:
-        chatbot = RAGChatbot(
-            nvidia_api_key=api_key,
-            nvidia_api_url=api_url,
-            model_name=model_name
-        )
+        chatbot = RAGChatbot(**settings)
         
         # Try to load existing index
         if os.path.exists("indices/chatbot_index.index"):
@@ -350,18 +348,55 @@ def initialize_chatbot():
         st.error(f"❌ Error initializing chatbot: {e}")
         st.stop()
 
-def load_documents_into_chatbot(chatbot):
-    """Load documents from data/raw into chatbot"""
-    loader = DocumentLoader(data_dir="data/raw")
-    documents = loader.load_directory()
-    
-    if not documents:
+@st.cache_resource
+def get_ingest_worker(_chatbot):
+    """Background ingest worker shared by all sessions"""
+    return IngestWorker(
+        _chatbot,
+        loader=DocumentLoader(data_dir="data/raw",
+                              cache_dir=setting(load_config(), 'paths.data_processed', "data/processed")),
+        index_path="indices/chatbot_index"
+    )
+
+def load_documents_into_chatbot(worker, paths=None):
+    """Queue files (default: everything in data/raw) for background ingestion"""
+    if paths is None:
+        loader = worker.loader
+        paths = [p for p in loader.data_dir.rglob('*')
+                 if p.is_file() and p.suffix.lower() in loader.supported_formats]
+    
+    if not paths:
         return False, "No documents found in data/raw/"
     
-    chatbot.add_documents(documents)
-    chatbot.save_index("indices/chatbot_index")
-    
-    return True, f"Loaded {len(documents)} document(s)"
+    job = worker.submit(paths)
+    return True, f"Queued {len(job.paths)} document(s) for indexing"
+
+@st.fragment(run_every=1)
+def show_ingest_progress(worker):
+    """Live progress for running ingest jobs; chat stays usable meanwhile"""
+    active = worker.active_jobs()
+    
+    for job in active:
+        status = job.status()
+        st.progress(
+            status['files_done'] / max(status['files_total'], 1),
+            text=f"Indexing {status['files_done']}/{status['files_total']} files"
+        )
+        details = f"{status['chunks_added']} chunks"
+        if status['current_file']:
+            details += f" · {status['current_file']}"
+        if status['files_per_sec']:
+            details += f" · {status['files_per_sec']:.1f} files/s"
+        if status['eta_seconds'] is not None:
+            details += f" · ETA {status['eta_seconds']:.0f}s"
+        st.caption(details)
+    
+    # Refresh the whole page once the last job finishes so counts update
+    if active:
+        st.session_state.ingest_running = True
+    elif st.session_state.get('ingest_running'):
+        st.session_state.ingest_running = False
+        st.rerun()
 
 def main():
     # Header
@@ -371,14 +406,15 @@ def main():
     # Initialize chatbot
     with st.spinner("🔄 Initializing chatbot..."):
         chatbot, index_loaded = initialize_chatbot()
+    worker = get_ingest_worker(chatbot)
     
     # Sidebar
     with st.sidebar:
         st.header("Settings")
         
         # Status
-        if index_loaded:
-            st.success(f"Index loaded: {len(chatbot.chunks)} chunks")
+        if chatbot.chunk_count > 0:
+            st.success(f"Index loaded: {chatbot.chunk_count} chunks")
         else:
             st.warning("No documents indexed")
         
@@ -397,40 +433,38 @@ def main():
         
         if uploaded_files:
             if st.button("Upload & Process", use_container_width=True):
-                with st.spinner("Uploading and processing files..."):
-                    try:
-                        # Create data/raw directory if it doesn't exist
-                        os.makedirs("data/raw", exist_ok=True)
-                        
-                        uploaded_count = 0
-                        for uploaded_file in uploaded_files:
-                            # Save file to data/raw
-                            file_path = os.path.join("data/raw", uploaded_file.name)
-                            with open(file_path, "wb") as f:
-                                f.write(uploaded_file.getbuffer())
-                            uploaded_count += 1
-                        
-                        # Reload documents
-                        success, message = load_documents_into_chatbot(chatbot)
-                        if success:
-                            st.success(f"✅ Uploaded {uploaded_count} file(s). {message}")
-                            st.rerun()
-                        else:
-                            st.error(message)
-                    except Exception as e:
-                        st.error(f"❌ Error uploading files: {e}")
+                try:
+                    # Create data/raw directory if it doesn't exist
+                    os.makedirs("data/raw", exist_ok=True)
+                    
+                    saved_paths = []
+                    for uploaded_file in uploaded_files:
+                        # Save file to data/raw
+                        file_path = os.path.join("data/raw", uploaded_file.name)
+                        with open(file_path, "wb") as f:
+                            f.write(uploaded_file.getbuffer())
+                        saved_paths.append(file_path)
+                    
+                    # Index only the new files, in the background
+                    success, message = load_documents_into_chatbot(worker, saved_paths)
+                    st.success(f"✅ Uploaded {len(saved_paths)} file(s). {message}")
+                except Exception as e:
+                    st.error(f"❌ Error uploading files: {e}")
         
         if st.button("Reload Documents", use_container_width=True):
-            with st.spinner("Loading documents..."):
-                success, message = load_documents_into_chatbot(chatbot)
-                if success:
-                    st.success(message)
-                    st.rerun()
-                else:
-                    st.error(message)
+            success, message = load_documents_into_chatbot(worker)
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+        
+        show_ingest_progress(worker)
         
         if st.button("Clear All Documents", use_container_width=True, type="secondary"):
             if st.session_state.get('confirm_clear', False):
+                # Stop background ingestion first so it cannot re-save the index
+                worker.stop(cancel=True)
+                
                 # Delete all files in data/raw
                 import shutil
                 if os.path.exists("data/raw"):
@@ -444,7 +478,7 @@ def main():
                 if os.path.exists("indices/chatbot_index.meta"):
                     os.remove("indices/chatbot_index.meta")
                 
-                # Clear the cached chatbot
+                # Clear the cached chatbot and worker
                 st.cache_resource.clear()
                 
                 st.session_state.confirm_clear = False
@@ -456,7 +490,8 @@ def main():
         
         # Document info
         if hasattr(chatbot, 'metadata') and chatbot.metadata:
-            sources = list(set([m['source'] for m in chatbot.metadata]))
+            # Precomputed per snapshot, so reruns don't rescan every chunk
+            sources = chatbot.metadata.sources()
             st.caption(f"{len(sources)} document(s) loaded")
             with st.expander("View documents"):
                 for source in sources:
@@ -474,6 +509,7 @@ def main():
         # Clear chat button
         if st.button("Clear Chat", use_container_width=True):
             st.session_state.messages = []
+            st.session_state.pop('memory', None)
             st.rerun()
         
         st.divider()
@@ -482,13 +518,17 @@ def main():
         st.caption("Supported: PDF, DOCX, TXT, MD")
     
     # Check if documents are loaded
-    if not hasattr(chatbot, 'chunks') or len(chatbot.chunks) == 0:
+    if not hasattr(chatbot, 'chunks') or chatbot.chunk_count == 0:
         st.info("Upload documents using the sidebar to get started.")
         return
     
     # Initialize chat history
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "memory" not in st.session_state:
+        # Token-bounded history so follow-up questions keep their context
+        st.session_state.memory = ConversationMemory(tokenizer=chatbot.chunker.tokenizer,
+                                                     **conversation_settings(load_config()))
     
     # Display chat messages
     for message in st.session_state.messages:
@@ -514,7 +554,12 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("🤔 Thinking..."):
                 try:
-                    result = chatbot.chat(prompt, top_k=top_k, show_sources=show_sources)
+                    result = chatbot.chat(
+                        prompt,
+                        top_k=top_k,
+                        show_sources=show_sources,
+                        memory=st.session_state.memory
+                    )
                     response = result['response']
                     
                     # Display response
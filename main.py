@@ -6,6 +6,9 @@ import sys
 
 from src.rag_chatbot import RAGChatbot
 from src.document_loader import DocumentLoader
+from src.conversation import ConversationMemory
+from src.watcher import DirectoryWatcher
+from src.config import chatbot_settings, conversation_settings, load_config, setting
 
 # Configure logging
 logger.remove()
@@ -17,27 +20,22 @@ def setup_chatbot():
     # Load environment variables
     load_dotenv()
     
-    # Get API credentials
-    api_key = os.getenv('NVIDIA_API_KEY')
-    api_url = os.getenv('NVIDIA_API_URL')
-    model_name = os.getenv('NVIDIA_MODEL', 'openai/gpt-oss-20b')
+    # Environment variables override config/config.yaml
+    settings = chatbot_settings(load_config())
     
-    if not api_key or not api_url:
+    if not settings['nvidia_api_key'] or not settings['nvidia_api_url']:
         logger.error("Missing NVIDIA API credentials in .env file")
         sys.exit(1)
     
     # Initialize chatbot
-    chatbot = RAGChatbot(
-        nvidia_api_key=api_key,
-        nvidia_api_url=api_url,
-        model_name=model_name
-    )
+    chatbot = RAGChatbot(**settings)
     
     return chatbot
 
 def load_documents(chatbot):
     """Load documents into the chatbot"""
-    loader = DocumentLoader(data_dir="data/raw")
+    cache_dir = setting(load_config(), 'paths.data_processed', "data/processed")
+    loader = DocumentLoader(data_dir="data/raw", cache_dir=cache_dir)
     
     # Load all documents from data/raw
     documents = loader.load_directory()
@@ -49,6 +47,9 @@ def load_documents(chatbot):
     # Add to chatbot
     chatbot.add_documents(documents)
     
+    # Re-derive the relevance cut-off from the corpus unless one was configured
+    chatbot.auto_calibrate()
+    
     # Save index
     chatbot.save_index("indices/chatbot_index")
     
@@ -58,6 +59,8 @@ def interactive_chat(chatbot):
     """Run interactive chat session"""
     logger.info("Starting interactive chat. Type 'quit' to exit.")
     print("\n🤖 RAG Chatbot Ready! Ask me anything.\n")
+    memory = ConversationMemory(tokenizer=chatbot.chunker.tokenizer,
+                                **conversation_settings(load_config()))
     
     while True:
         try:
@@ -71,7 +74,7 @@ def interactive_chat(chatbot):
                 continue
             
             # Get response
-            result = chatbot.chat(query)
+            result = chatbot.chat(query, memory=memory)
             
             print(f"\n🤖 Bot: {result['response']}\n")
             
@@ -110,8 +113,21 @@ def main():
             logger.error("Failed to load documents. Add files to data/raw/")
             sys.exit(1)
     
+    # Keep the index in step with the watched directories while chatting
+    watcher = None
+    if os.getenv('WATCH_DATA', 'false').lower() == 'true':
+        config = load_config()
+        watch_roots = setting(config, 'paths.watch_roots', ["data/raw"])
+        loader = DocumentLoader(cache_dir=setting(config, 'paths.data_processed', "data/processed"))
+        watcher = DirectoryWatcher(chatbot, watch_roots, loader=loader, index_path="indices/chatbot_index")
+        watcher.start()
+    
     # Start interactive chat
-    interactive_chat(chatbot)
+    try:
+        interactive_chat(chatbot)
+    finally:
+        if watcher is not None:
+            watcher.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare DOCX extraction through python-docx (the previous loader path) with the
+streaming document.xml reader: wall time, peak memory growth and characters
+extracted, including how much table text each path captures.
+"""
+import os
+import sys
+import time
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def python_docx_extract(filepath: Path) -> str:
+    """What DocumentLoader returned before the streaming reader: body paragraphs only"""
+    import docx
+    doc = docx.Document(filepath)
+    return '\n'.join(paragraph.text for paragraph in doc.paragraphs)
+
+def streaming_extract(filepath: Path) -> str:
+    from src.docx_reader import iter_docx_blocks
+    return '\n'.join(text for _, text, _ in iter_docx_blocks(filepath))
+
+METHODS = {'python-docx': python_docx_extract, 'streaming': streaming_extract}
+
+def _measure(method: str, filepath: str, queue):
+    # Import both libraries before taking the baseline
+    import docx  # noqa: F401
+    from src import docx_reader  # noqa: F401
+    extract = METHODS[method]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    text = extract(Path(filepath))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    queue.put((seconds, peak * 1024, len(text)))
+
+def measure(method: str, filepath: Path):
+    """Run one extraction in a fresh process: (seconds, peak RSS growth bytes, chars)"""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(method, str(filepath), queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"{method} extraction of {filepath} failed")
+    return queue.get()
+
+def generate_docx(path: Path, pages: int):
+    """Synthetic spec document: headings, prose and a table on every page"""
+    import docx
+    doc = docx.Document()
+    for page in range(pages):
+        doc.add_heading(f"Section {page}", level=1 + page % 3)
+        for para in range(6):
+            doc.add_paragraph(f"Requirement {page}.{para}: the component shall process "
+                              f"inputs within the documented limits. " * 4)
+        table = doc.add_table(rows=6, cols=4)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f"param {page}.{r}.{c}" if r else f"column {c}"
+    doc.save(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="*", help=".docx files to extract")
+    parser.add_argument("--data-dir", help="Benchmark every .docx under this directory")
+    parser.add_argument("--generate-pages", type=int, default=500,
+                        help="Without files, benchmark a synthetic document this many pages long")
+    args = parser.parse_args()
+
+    files = [Path(f) for f in args.files]
+    if args.data_dir:
+        files += sorted(Path(args.data_dir).rglob('*.docx'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not files:
+            path = Path(tmp) / f"synthetic_{args.generate_pages}p.docx"
+            logger.info(f"Generating {args.generate_pages}-page document")
+            generate_docx(path, args.generate_pages)
+            files = [path]
+
+        print(f"\n{'file':<28} {'method':<12} {'seconds':>8} {'peak MB':>8} {'chars':>10}")
+        for filepath in files:
+            for method in METHODS:
+                seconds, peak, chars = measure(method, filepath)
+                print(f"{filepath.name[:28]:<28} {method:<12} {seconds:>8.2f} "
+                      f"{peak / 1e6:>8.1f} {chars:>10,}")
+
+if __name__ == "__main__":
+    main()
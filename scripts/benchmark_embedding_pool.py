@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Compare ingest embedding throughput of the single-process model with the
+multi-process EmbeddingPool at several worker counts. Pool start-up, warm-up
+and batch-size tuning are reported separately from steady-state throughput.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chunking import TextChunker
+from src.document_loader import DocumentLoader
+from src.embedding_pool import EmbeddingPool
+from src.embeddings import EmbeddingManager
+
+def load_chunks(data_dir: str, chunk_size: int, limit: int):
+    """Chunk documents in data_dir; synthetic sentences if it has none"""
+    chunker = TextChunker(chunk_size, chunk_size // 10)
+    chunks = []
+    for doc in DocumentLoader(data_dir=data_dir).load_directory():
+        chunks.extend(chunker.chunk_by_tokens(doc['text']))
+    if not chunks:
+        logger.warning(f"No documents in {data_dir}; using synthetic text")
+        chunks = [f"Requirement {i}: the component shall process inputs within the documented "
+                  f"limits and report errors to the operator. " * 8 for i in range(limit)]
+    return chunks[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data/raw")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--max-chunks", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4],
+                        help="Pool sizes to compare against a single process")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.data_dir, args.chunk_size, args.max_chunks)
+    model_kwargs = {'backend': args.backend}
+
+    single = EmbeddingManager(backend=args.backend)
+    single.embed_texts(chunks[:64])  # warm-up
+    start = time.perf_counter()
+    reference = single.embed_texts(chunks)
+    single_rate = len(chunks) / (time.perf_counter() - start)
+
+    print(f"\n{'workers':>7} {'start s':>8} {'tune s':>7} {'batch':>6} {'chunks/s':>9} {'speedup':>8} {'max diff':>9}")
+    print(f"{1:>7} {'-':>8} {'-':>7} {32:>6} {single_rate:>9.1f} {1.0:>8.2f} {0.0:>9.1e}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        with EmbeddingPool(single.model_name, num_workers=workers, model_kwargs=model_kwargs) as pool:
+            started = time.perf_counter()
+            batch_size, _ = pool.tune_batch_size(chunks)
+            tuned = time.perf_counter()
+            vectors = pool.embed(chunks)
+            rate = len(chunks) / (time.perf_counter() - tuned)
+        diff = float(np.abs(vectors - reference).max())
+        print(f"{workers:>7} {started - start:>8.1f} {tuned - started:>7.1f} {batch_size:>6} "
+              f"{rate:>9.1f} {rate / single_rate:>8.2f} {diff:>9.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare torch and ONNX embedding backends: per-query latency and recall
+against an index built with the torch backend.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chunking import TextChunker
+from src.document_loader import DocumentLoader
+from src.embeddings import EmbeddingManager
+from src.onnx_backend import FP32_TOLERANCE, INT8_TOLERANCE
+
+def load_corpus(data_dir: str, chunk_size: int, limit: int):
+    """Chunk documents in data_dir into at most limit chunks"""
+    chunker = TextChunker(chunk_size, chunk_size // 10)
+    chunks = []
+    for doc in DocumentLoader(data_dir=data_dir).load_directory():
+        chunks.extend(chunker.chunk_by_tokens(doc['text']))
+    return chunks[:limit]
+
+def query_latencies(embedder: EmbeddingManager, queries):
+    """Per-query embedding latency in milliseconds"""
+    embedder.embed_query(queries[0])  # warm-up
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.embed_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data/raw")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--max-chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    chunks = load_corpus(args.data_dir, args.chunk_size, args.max_chunks)
+    if len(chunks) < args.top_k:
+        logger.error(f"Need at least {args.top_k} chunks in {args.data_dir}")
+        sys.exit(1)
+
+    # Queries: leading sentence of a sample of chunks
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(chunks), size=min(args.queries, len(chunks)), replace=False)
+    queries = [chunks[i].split('.')[0][:200] for i in sample]
+
+    reference = EmbeddingManager(backend='torch')
+    index = faiss.IndexFlatL2(reference.embedding_dim)
+    index.add(reference.embed_texts(chunks))
+    ref_queries = np.vstack([reference.embed_query(q) for q in queries])
+    _, ref_ids = index.search(ref_queries, args.top_k)
+
+    backends = [
+        ('torch', reference, None),
+        ('onnx-fp32', EmbeddingManager(backend='onnx'), FP32_TOLERANCE),
+        ('onnx-int8', EmbeddingManager(backend='onnx', quantize=True), INT8_TOLERANCE),
+    ]
+
+    failed = False
+    print(f"\n{'backend':<10} {'p50 ms':>8} {'p95 ms':>8} {'min cos':>9} {'recall@' + str(args.top_k):>10}")
+    for name, embedder, tolerance in backends:
+        latencies = query_latencies(embedder, queries)
+        vectors = np.vstack([embedder.embed_query(q) for q in queries])
+
+        cosine = np.sum(vectors * ref_queries, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(ref_queries, axis=1))
+        _, ids = index.search(vectors, args.top_k)
+        recall = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(ids, ref_ids)])
+
+        print(f"{name:<10} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+              f"{cosine.min():>9.5f} {recall:>10.3f}")
+        if tolerance is not None and cosine.min() < tolerance:
+            logger.error(f"{name}: min cosine {cosine.min():.5f} below tolerance {tolerance}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
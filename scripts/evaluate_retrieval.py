@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Evaluate retrieval quality and speed over a grid of chunking/index settings:
+recall@k, MRR, nDCG@k, p50/p95 retrieval latency, index size and build time.
+Exits non-zero when a regression threshold is exceeded.
+"""
+import os
+import sys
+import json
+import argparse
+import yaml
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.document_loader import DocumentLoader
+from src.evaluation import (check_regressions, evaluate_grid, generate_dataset,
+                            load_dataset, save_dataset)
+
+THRESHOLD_NAMES = ('min_recall', 'min_mrr', 'min_ndcg', 'max_p95_ms', 'max_build_seconds',
+                   'max_index_bytes', 'max_quality_drop', 'max_latency_increase')
+
+def int_list(value: str):
+    return [int(v) for v in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data/raw")
+    parser.add_argument("--dataset", help="JSONL of {question, relevant_sources}; "
+                                          "synthesized from the corpus if omitted")
+    parser.add_argument("--save-dataset", help="Write the (synthetic) dataset here for reuse")
+    parser.add_argument("--questions-per-doc", type=int, default=5)
+    parser.add_argument("--chunk-sizes", type=int_list, default=[500])
+    parser.add_argument("--chunk-overlaps", type=int_list, default=[50])
+    parser.add_argument("--metrics", type=lambda v: v.split(','), default=['l2'])
+    parser.add_argument("--top-k", type=int_list, default=[3, 5, 10])
+    parser.add_argument("--thresholds", help="YAML/JSON file of regression thresholds, "
+                                             "e.g. config/config.yaml (its evaluation section)")
+    parser.add_argument("--baseline", help="Results JSON of a previous run to compare against")
+    parser.add_argument("--output", help="Write results JSON here")
+    for name in THRESHOLD_NAMES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, dest=name)
+    args = parser.parse_args()
+
+    documents = DocumentLoader(data_dir=args.data_dir).load_directory()
+    if not documents:
+        logger.error(f"No documents found in {args.data_dir}")
+        sys.exit(1)
+
+    if args.dataset:
+        dataset = load_dataset(args.dataset)
+    else:
+        dataset = generate_dataset(documents, args.questions_per_doc)
+        logger.info(f"Synthesized {len(dataset)} questions from {len(documents)} documents")
+    if args.save_dataset:
+        save_dataset(dataset, args.save_dataset)
+
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds, 'r', encoding='utf-8') as f:
+            thresholds = yaml.safe_load(f) or {}
+        thresholds = dict(thresholds.get('evaluation', thresholds))
+    # Flags override the file
+    thresholds.update({name: getattr(args, name) for name in THRESHOLD_NAMES
+                       if getattr(args, name) is not None})
+
+    rows = evaluate_grid(documents, dataset, args.chunk_sizes, args.chunk_overlaps,
+                         args.metrics, args.top_k)
+    if not rows:
+        logger.error("No valid configuration in the grid")
+        sys.exit(1)
+
+    print(f"\n{'size':>5} {'overlap':>7} {'metric':>6} {'k':>3} {'recall':>7} {'mrr':>6} {'ndcg':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'chunks':>7} {'index MB':>9} {'build s':>8}")
+    for row in rows:
+        print(f"{row['chunk_size']:>5} {row['chunk_overlap']:>7} {row['metric']:>6} {row['top_k']:>3} "
+              f"{row['recall']:>7.3f} {row['mrr']:>6.3f} {row['ndcg']:>6.3f} "
+              f"{row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f} {row['chunks']:>7} "
+              f"{row['index_bytes'] / 1e6:>9.2f} {row['build_seconds']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'questions': len(dataset), 'results': rows}, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    failures = check_regressions(rows, thresholds, baseline)
+    for failure in failures:
+        logger.error(failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Predict RAM, disk and build time for indexing a corpus, from corpus statistics
+and an index configuration. With --validate, build the index for real and fail
+if the prediction is off by more than the tolerance.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import numpy as np
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chunking import TextChunker
+from src.document_loader import DocumentLoader
+from src.dedup import MinHashDeduplicator
+from src.memory import model_bytes, plan_capacity
+
+def sample_texts(chunk_size: int, chars_per_token: float, samples: int = 256):
+    """Random-word texts about chunk_size tokens long"""
+    rng = np.random.default_rng(0)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'capacity', 'planner', 'index']
+    text_words = max(int(chunk_size * chars_per_token / 6), 1)
+    return [' '.join(rng.choice(words, text_words)) for _ in range(samples)]
+
+def corpus_stats(documents, tokenizer):
+    """Per-document token counts plus the averages the planner needs"""
+    tokens = np.array([len(tokenizer.encode(doc['text'])) for doc in documents])
+    chars = sum(len(doc['text']) for doc in documents)
+    return {
+        'doc_tokens': tokens,
+        'chars_per_token': chars / max(int(tokens.sum()), 1),
+        'avg_source_chars': int(np.mean([len(doc['source']) for doc in documents])),
+        'avg_path_chars': int(np.mean([len(doc.get('path', '')) for doc in documents]))
+    }
+
+def measure_dedup(texts) -> float:
+    """Chunks/sec through MinHash signing, lookup and insertion"""
+    dedup = MinHashDeduplicator()
+    start = time.perf_counter()
+    for item_id, text in enumerate(texts):
+        signature = dedup.signature(text)
+        dedup.find(signature)
+        dedup.add(item_id, signature)
+    return len(texts) / (time.perf_counter() - start)
+
+def measure_embedder(texts):
+    """Embedding model, dimension, model bytes and chunks/sec for these texts"""
+    from src.embeddings import EmbeddingManager
+    embedder = EmbeddingManager()
+    embedder.embed_texts(texts[:8])  # warm-up
+    start = time.perf_counter()
+    embedder.embed_texts(texts)
+    rate = len(texts) / (time.perf_counter() - start)
+    return embedder, embedder.embedding_dim, model_bytes(embedder.model), rate
+
+def validate(plan, args, documents, embedder, tolerance: float, time_tolerance: float) -> bool:
+    """Build the planned index, compare measurements to the plan; True when within tolerance"""
+    from src.rag_chatbot import RAGChatbot
+    chatbot = RAGChatbot(
+        nvidia_api_key="",
+        nvidia_api_url="http://localhost/unused",
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        parent_chunk_size=args.parent_chunk_size,
+        dedup=args.dedup,
+        embedder=embedder
+    )
+    start = time.perf_counter()
+    chatbot.add_documents(documents)
+    build_seconds = time.perf_counter() - start
+
+    measured = chatbot.memory_usage()
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot.save_index(os.path.join(tmp, 'index'))
+        disk = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+
+    rows = [(name, plan['ram_bytes'][name], measured[name], None)
+            for name in ('index', 'chunks', 'metadata', 'texts', 'dedup')]
+    ram_planned = plan['ram_bytes']['total'] - plan['ram_bytes']['model']
+    ram_measured = measured['total'] - measured['model']
+    rows += [('ram (excl. model)', ram_planned, ram_measured, tolerance),
+             ('disk', plan['disk_bytes']['total'], disk, tolerance),
+             ('build seconds', plan['build_seconds'], build_seconds, time_tolerance)]
+
+    ok = True
+    print(f"\n{'component':<18} {'planned':>14} {'measured':>14} {'error':>8}")
+    for name, planned, actual, limit in rows:
+        error = (planned - actual) / actual if actual else 0.0
+        print(f"{name:<18} {planned:>14,.2f} {actual:>14,.2f} {error:>+8.1%}")
+        if limit is not None and abs(error) > limit:
+            logger.error(f"{name}: planned {planned:,.0f} vs measured {actual:,.0f} ({error:+.1%})")
+            ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus-dir", help="Measure corpus statistics from these documents")
+    parser.add_argument("--docs", type=int, help="Documents to plan for (scales a measured corpus)")
+    parser.add_argument("--avg-doc-tokens", type=float, help="Tokens per document, without --corpus-dir")
+    parser.add_argument("--chars-per-token", type=float, default=4.0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--parent-chunk-size", type=int)
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--dedup", action="store_true")
+    parser.add_argument("--dedup-ratio", type=float, default=0.0, help="Fraction of chunks collapsed")
+    parser.add_argument("--chunks-per-sec", type=float, help="Embedding throughput")
+    parser.add_argument("--model-bytes", type=int, default=0)
+    parser.add_argument("--measure", action="store_true",
+                        help="Load the embedding model to measure dim, size and throughput")
+    parser.add_argument("--validate", action="store_true",
+                        help="Build the --corpus-dir index and compare against the plan")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--time-tolerance", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    args = parser.parse_args()
+
+    if args.validate and not args.corpus_dir:
+        parser.error("--validate needs --corpus-dir")
+
+    tokenizer = TextChunker().tokenizer
+    documents = []
+    stats = {'chars_per_token': args.chars_per_token, 'avg_source_chars': 24, 'avg_path_chars': 48}
+    if args.corpus_dir:
+        documents = DocumentLoader(data_dir=args.corpus_dir).load_directory()
+        if not documents:
+            logger.error(f"No documents found in {args.corpus_dir}")
+            sys.exit(1)
+        stats = corpus_stats(documents, tokenizer)
+        doc_tokens = stats.pop('doc_tokens')
+        if args.docs and not args.validate:
+            # Repeat the measured length distribution up to the target size
+            doc_tokens = np.resize(doc_tokens, args.docs)
+    elif args.docs and args.avg_doc_tokens:
+        doc_tokens = np.full(args.docs, args.avg_doc_tokens)
+    else:
+        parser.error("give --corpus-dir, or --docs with --avg-doc-tokens")
+
+    embedder = None
+    dim, size, rate, dedup_rate = args.dim, args.model_bytes, args.chunks_per_sec, None
+    if args.measure or args.validate:
+        texts = sample_texts(args.chunk_size, stats['chars_per_token'])
+        embedder, dim, size, rate = measure_embedder(texts)
+        logger.info(f"Embedding: dim={dim}, model={size / 1e6:.0f} MB, {rate:.0f} chunks/sec")
+        if args.dedup:
+            dedup_rate = measure_dedup(texts)
+            logger.info(f"Dedup: {dedup_rate:.0f} chunks/sec")
+
+    plan_args = dict(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, embedding_dim=dim,
+                     parent_chunk_size=args.parent_chunk_size, dedup=args.dedup,
+                     dedup_ratio=args.dedup_ratio, chunks_per_sec=rate,
+                     dedup_chunks_per_sec=dedup_rate, model_size=size, **stats)
+    plan = plan_capacity(doc_tokens, **plan_args)
+
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print(f"\n{plan['documents']:,} documents -> {plan['chunks']:,} chunks "
+              f"({plan['indexed_chunks']:,} indexed)")
+        for name, value in plan['ram_bytes'].items():
+            print(f"  RAM  {name:<11} {value / 1e6:>12,.1f} MB")
+        for name, value in plan['disk_bytes'].items():
+            print(f"  disk {name:<11} {value / 1e6:>12,.1f} MB")
+        if plan['build_seconds'] is not None:
+            print(f"  build time       {plan['build_seconds']:>12,.1f} s")
+
+    if args.validate:
+        if args.dedup and not args.dedup_ratio:
+            logger.warning("--dedup without --dedup-ratio plans for no collapsed chunks")
+        if not validate(plan, args, documents, embedder, args.tolerance, args.time_tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible chat completions stub for local testing.
+Point NVIDIA_API_URL at http://HOST:PORT/v1/chat/completions.
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    jitter = 0.0
+    token_delay = 0.0
+    reply = "This is a stub answer."
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.delay + random.random() * self.jitter)
+
+        if payload.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for word in self.reply.split(' '):
+                chunk = {'choices': [{'delta': {'content': word + ' '}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        body = json.dumps({
+            'model': payload.get('model'),
+            'choices': [{'message': {'role': 'assistant', 'content': self.reply}}]
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_server(port: int = 0, delay: float = 0.0, jitter: float = 0.0, token_delay: float = 0.0):
+    """Create (but do not start) a stub server; port 0 picks a free port"""
+    handler = type('StubHandler', (StubLLMHandler,), {
+        'delay': delay, 'jitter': jitter, 'token_delay': token_delay
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay, seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.delay, args.jitter, args.token_delay)
+    print(f"Stub LLM on http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+HTTP retrieval/chat service around a single warm RAGChatbot
+"""
+import os
+import argparse
+from loguru import logger
+
+from main import setup_chatbot
+from src.server import serve
+from src.watcher import DirectoryWatcher
+from src.document_loader import DocumentLoader
+from src.config import load_config, setting
+
+INDEX_PATH = "indices/chatbot_index"
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG chatbot HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="Requests handled concurrently")
+    parser.add_argument("--max-queue", type=int, default=64, help="Requests waiting for a worker")
+    parser.add_argument("--per-client", type=int, default=4, help="Concurrent connections per client IP")
+    parser.add_argument("--request-timeout", type=float, default=10.0,
+                        help="Seconds a socket read/write may block before the connection is dropped")
+    parser.add_argument("--watch", nargs="*", action="extend", metavar="DIR",
+                        help="Index files created, modified or deleted under DIR (repeatable); "
+                             "without DIR, under paths.watch_roots from the config")
+    args = parser.parse_args()
+    
+    config = load_config()
+    loader = DocumentLoader(cache_dir=setting(config, 'paths.data_processed', "data/processed"))
+    watch_roots = args.watch
+    if watch_roots == []:
+        watch_roots = setting(config, 'paths.watch_roots', ["data/raw"])
+    
+    chatbot = setup_chatbot()
+    if os.path.exists(f"{INDEX_PATH}.index"):
+        chatbot.load_index(INDEX_PATH)
+    else:
+        logger.warning("No index found; POST /ingest to add documents")
+    
+    watcher = None
+    if watch_roots:
+        watcher = DirectoryWatcher(chatbot, watch_roots, loader=loader, index_path=INDEX_PATH)
+        watcher.start()
+    
+    try:
+        serve(
+            chatbot,
+            host=args.host,
+            port=args.port,
+            max_workers=args.workers,
+            max_queue=args.max_queue,
+            per_client_limit=args.per_client,
+            request_timeout=args.request_timeout,
+            data_roots=[setting(config, 'paths.data_raw', "data/raw")] + (watch_roots or []),
+            index_path=INDEX_PATH,
+            loader=loader
+        )
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
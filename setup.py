@@ -16,5 +16,9 @@ setup(
         "pyyaml>=6.0",
         "loguru>=0.7.0",
     ],
+    extras_require={
+        "onnx": ["onnxruntime>=1.16.0", "onnx>=1.14.0"],
+        "watch": ["watchdog>=3.0.0"],
+    },
     python_requires=">=3.8",
 )
\ No newline at end of file
@@ -1,5 +1,5 @@
 import tiktoken
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 class TextChunker:
     """Handle text chunking with various strategies"""
@@ -24,6 +24,33 @@ class TextChunker:
         
         return chunks
     
+    def parent_spans(self, text: str, sections: Optional[List[Dict]] = None,
+                     max_tokens: int = 1024) -> List[Tuple[int, int]]:
+        """Char spans of parent sections, split at line breaks to at most max_tokens"""
+        spans = []
+        for section in sections or [{'start': 0, 'end': len(text)}]:
+            span_start = pos = section['start']
+            size = 0
+            for line in text[section['start']:section['end']].splitlines(keepends=True):
+                n = len(self.tokenizer.encode(line))
+                if size + n > max_tokens and pos > span_start:
+                    spans.append((span_start, pos))
+                    span_start, size = pos, 0
+                if n > max_tokens:
+                    # A single overlong line: cut it into equal character runs
+                    pieces = -(-n // max_tokens)
+                    step = -(-len(line) // pieces)
+                    for start in range(pos, pos + len(line), step):
+                        spans.append((start, min(start + step, pos + len(line))))
+                    pos += len(line)
+                    span_start = pos
+                    continue
+                size += n
+                pos += len(line)
+            if pos > span_start:
+                spans.append((span_start, pos))
+        return [(start, end) for start, end in spans if text[start:end].strip()]
+    
     def chunk_by_sentences(self, text: str, max_chunk_size: int = None) -> List[str]:
         """Chunk text by sentences, respecting max size"""
         if max_chunk_size is None:
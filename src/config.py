@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+import yaml
+
+DEFAULT_CONFIG_PATH = "config/config.yaml"
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Sections of config/config.yaml (or $CONFIG_PATH); empty if the file is missing
+
+    Entry points use these values as defaults; environment variables still win.
+    """
+    path = Path(path or os.getenv('CONFIG_PATH', DEFAULT_CONFIG_PATH))
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+def setting(config: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """Value of a "section.key" setting; null or missing gives the default"""
+    section, name = key.split('.', 1)
+    value = (config.get(section) or {}).get(name)
+    return default if value is None else value
+
+def _env(name: str, config: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """$name if set and non-empty, else the config value, else default"""
+    value = os.getenv(name)
+    return value if value not in (None, '') else setting(config, key, default)
+
+def _flag(value: Any) -> bool:
+    return value if isinstance(value, bool) else str(value).lower() == 'true'
+
+def chatbot_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """RAGChatbot keyword arguments from the environment, falling back to config"""
+    from .llm_router import parse_endpoints
+
+    api_key = os.getenv('NVIDIA_API_KEY')
+    min_similarity = _env('MIN_SIMILARITY', config, 'rag.min_similarity')
+    parent_chunk_size = _env('PARENT_CHUNK_SIZE', config, 'rag.parent_chunk_size')
+    return {
+        'nvidia_api_key': api_key,
+        'nvidia_api_url': os.getenv('NVIDIA_API_URL'),
+        'model_name': _env('NVIDIA_MODEL', config, 'nvidia.model', 'openai/gpt-oss-20b'),
+        'embedding_workers': int(_env('EMBEDDING_WORKERS', config, 'rag.embedding_workers', 1)),
+        'embedding_backend': _env('EMBEDDING_BACKEND', config, 'rag.embedding_backend', 'torch'),
+        'embedding_quantize': _flag(_env('EMBEDDING_QUANTIZE', config, 'rag.embedding_quantize', False)),
+        'metric': _env('SEARCH_METRIC', config, 'rag.metric', 'l2'),
+        'min_similarity': float(min_similarity) if min_similarity is not None else None,
+        'dedup': _flag(_env('DEDUP_CHUNKS', config, 'rag.dedup', False)),
+        'dedup_threshold': float(_env('DEDUP_THRESHOLD', config, 'rag.dedup_threshold', 0.8)),
+        'llm_endpoints': parse_endpoints(_env('LLM_ENDPOINTS', config, 'nvidia.endpoints', []), api_key),
+        'hedge_requests': _flag(_env('LLM_HEDGE', config, 'nvidia.hedge', False)),
+        'hedge_percentile': float(_env('LLM_HEDGE_PERCENTILE', config, 'nvidia.hedge_percentile', 95.0)),
+        'chunk_size': int(_env('CHUNK_SIZE', config, 'rag.chunk_size', 500)),
+        'chunk_overlap': int(_env('CHUNK_OVERLAP', config, 'rag.chunk_overlap', 50)),
+        'parent_chunk_size': int(parent_chunk_size) if parent_chunk_size is not None else None
+    }
+
+def conversation_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """ConversationMemory keyword arguments from the conversation section"""
+    return {
+        'max_tokens': int(setting(config, 'conversation.max_tokens', 1024)),
+        'recent_turns': int(setting(config, 'conversation.recent_turns', 3)),
+        'summary_tokens': int(setting(config, 'conversation.summary_tokens', 256))
+    }
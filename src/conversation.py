@@ -0,0 +1,98 @@
+import re
+import tiktoken
+from typing import List, Optional, Tuple
+
+# Words and phrases that point back at something said earlier. Common words
+# such as "it", "this" or "first" also open standalone questions, so they only
+# count inside a reference like "the first one" or "that one".
+_FOLLOW_UP_RE = re.compile(
+    r"\b(they|them|their|these|those|he|she|him|his|her|former|latter|aforementioned)\b"
+    r"|\b(?:the|this|that)\s+(?:(?:first|second|third|last|other|same|previous)\s+)?ones?\b"
+    r"|\bthe\s+(?:same|above|previous)\b",
+    re.IGNORECASE
+)
+_FOLLOW_UP_PREFIXES = ('and ', 'what about', 'how about', 'also ', 'then ', 'so ')
+# A bare question word ("Why?", "How so?") can only be about the previous answer
+_BARE_QUESTION_RE = re.compile(r"^(?:why|how|when|where|who)(?:\s+(?:not|so))?\W*$")
+
+class ConversationMemory:
+    """Token-bounded chat history: recent turns verbatim, older turns summarized"""
+
+    def __init__(self, max_tokens: int = 1024, recent_turns: int = 3,
+                 summary_tokens: int = 256, tokenizer=None):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.tokenizer = tokenizer or tiktoken.get_encoding("cl100k_base")
+
+        self.turns: List[Tuple[str, str]] = []
+        self.summary_lines: List[str] = []
+        # Latest standalone question; follow-ups are anchored to it
+        self.anchor: Optional[str] = None
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.encode(text))
+
+    def _truncate(self, text: str, max_tokens: int, keep_end: bool = False) -> str:
+        tokens = self.tokenizer.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.tokenizer.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+
+    def _condense(self, user: str, assistant: str) -> str:
+        """One-line digest of a turn: the question and the answer's first sentence"""
+        first_sentence = re.split(r'(?<=[.!?])\s', assistant.strip(), maxsplit=1)[0]
+        return f"- Asked: {user.strip()} Answered: {first_sentence}"
+
+    def add_turn(self, user: str, assistant: str):
+        """Record a completed turn and compact history to fit the budget"""
+        self.turns.append((user, assistant))
+
+        while len(self.turns) > self.recent_turns or (
+                len(self.turns) > 1 and self.count_tokens(self._compose()) > self.max_tokens):
+            self.summary_lines.append(self._condense(*self.turns.pop(0)))
+
+            # Rolling summary: oldest digests fall off first
+            while len(self.summary_lines) > 1 and \
+                    self.count_tokens('\n'.join(self.summary_lines)) > self.summary_tokens:
+                self.summary_lines.pop(0)
+
+    def _compose(self) -> str:
+        parts = []
+        if self.summary_lines:
+            summary = self._truncate('\n'.join(self.summary_lines), self.summary_tokens, keep_end=True)
+            parts.append(f"Earlier in the conversation:\n{summary}")
+        for user, assistant in self.turns:
+            parts.append(f"User: {user}\nAssistant: {assistant}")
+        return '\n\n'.join(parts)
+
+    def render(self) -> str:
+        """History text for the prompt, never longer than max_tokens"""
+        # Only an oversized latest turn can still exceed the budget; keep its end
+        return self._truncate(self._compose(), self.max_tokens, keep_end=True)
+
+    def is_follow_up(self, query: str) -> bool:
+        """Heuristic: questions opening with a connective, or referring back, depend on earlier turns
+
+        Length alone says nothing: "Who approves expenses?" stands on its own.
+        """
+        lowered = query.strip().lower()
+        return (lowered.startswith(_FOLLOW_UP_PREFIXES)
+                or bool(_BARE_QUESTION_RE.match(lowered))
+                or bool(_FOLLOW_UP_RE.search(lowered)))
+
+    def rewrite_query(self, query: str) -> str:
+        """Anchor follow-up questions to the last standalone question
+
+        A chain of follow-ups keeps that anchor rather than nesting earlier
+        rewrites, so the retrieval query never drifts from the original topic.
+        """
+        if self.anchor and self.turns and self.is_follow_up(query):
+            return f"{self.anchor} {query}"
+        self.anchor = self._truncate(query, 64)
+        return query
+
+    def clear(self):
+        self.turns = []
+        self.summary_lines = []
+        self.anchor = None
@@ -0,0 +1,128 @@
+import re
+import zlib
+import numpy as np
+from typing import Dict, List, Optional
+
+# Prime just above 2**32; with a < 2**31 and 32-bit shingle hashes,
+# a * h + b stays below 2**64 so the permutations vectorize in uint64
+_PRIME = np.uint64(4294967311)
+_WORD_RE = re.compile(r"\w+")
+
+class MinHashDeduplicator:
+    """Find near-duplicate texts with MinHash signatures and banded LSH
+
+    Signatures are rows of one preallocated array indexed by item id. Each
+    band's buckets map an integer hash of the band to the newest item in it,
+    and _next chains every item to the previous one in the same bucket, so an
+    item costs one array row plus one dict entry per band.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)[:, None]
+        # Odd multipliers folding a band's values into one 64-bit key
+        self._mix = rng.integers(0, 1 << 63, self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self._buckets: List[Dict[int, int]] = [{} for _ in range(bands)]
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._next = np.zeros((0, bands), dtype=np.int32)
+        self._stored = np.zeros(0, dtype=bool)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        if len(words) <= k:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                           dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature over word shingles"""
+        hashes = self._shingle_hashes(text)[None, :]
+        # Minima lie below _PRIME; the rare ones past 2**32 wrap onto 0..14
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        """One integer key per band; the uint64 arithmetic wraps"""
+        bands = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return (bands * self._mix).sum(axis=1, dtype=np.uint64).tolist()
+
+    def find(self, signature: np.ndarray) -> Optional[int]:
+        """Id of the most similar stored item at or above threshold, if any"""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            item_id = self._buckets[band].get(key, -1)
+            while item_id >= 0 and item_id not in candidates:
+                candidates.add(item_id)
+                item_id = int(self._next[item_id, band])
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        ids = ids[self._stored[ids]]  # skip discarded items
+        if not len(ids):
+            return None
+
+        scores = (self._signatures[ids] == signature).mean(axis=1)
+        best = int(np.argmax(scores))
+        return int(ids[best]) if scores[best] >= self.threshold else None
+
+    def _grow(self, size: int):
+        capacity = max(size, 2 * len(self._stored), 64)
+        signatures = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+        signatures[:len(self._signatures)] = self._signatures
+        chain = np.full((capacity, self.bands), -1, dtype=np.int32)
+        chain[:len(self._next)] = self._next
+        stored = np.zeros(capacity, dtype=bool)
+        stored[:len(self._stored)] = self._stored
+        self._signatures, self._next, self._stored = signatures, chain, stored
+
+    def add(self, item_id: int, signature: np.ndarray):
+        """Store an item so later texts can match it; re-adding an id replaces it"""
+        if item_id >= len(self._stored):
+            self._grow(item_id + 1)
+        if not self._stored[item_id]:
+            self._stored[item_id] = True
+            self._count += 1
+        self._signatures[item_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band]
+            head = bucket.get(key, -1)
+            if head != item_id:
+                self._next[item_id, band] = head
+                bucket[key] = item_id
+
+    def discard(self, item_ids: List[int]):
+        """Stop matching these items; their bucket entries go at the next retain"""
+        ids = np.asarray(item_ids, dtype=np.int64)
+        ids = ids[ids < len(self._stored)]
+        ids = ids[self._stored[ids]]
+        self._stored[ids] = False
+        self._count -= len(ids)
+
+    def retain(self, keep_ids: List[int]):
+        """Drop every item not in keep_ids and renumber the rest 0..n-1 in that order"""
+        keep = np.asarray(keep_ids, dtype=np.int64)
+        signatures, stored = self._signatures[keep], self._stored[keep]
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = np.zeros((0, self.num_perm), dtype=np.uint32)
+        self._next = np.zeros((0, self.bands), dtype=np.int32)
+        self._stored = np.zeros(0, dtype=bool)
+        self._count = 0
+        if len(keep):
+            self._grow(len(keep))
+        for new_id in np.flatnonzero(stored).tolist():
+            self.add(new_id, signatures[new_id])
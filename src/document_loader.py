@@ -1,55 +1,134 @@
 import os
-from typing import List, Dict
+import unicodedata
+from typing import List, Dict, Optional, Tuple
 import PyPDF2
-import docx
 from pathlib import Path
 from loguru import logger
 
+from .docx_reader import iter_docx_blocks
+from .extraction_cache import ExtractionCache
+
+# Bump whenever extraction output changes so stale cache entries are ignored
+LOADER_VERSION = 4
+
+def normalize_text(text: str) -> str:
+    """NFC-compose characters and convert CR LF / CR line endings to LF"""
+    return unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n'))
+
 class DocumentLoader:
     """Load documents from various file formats"""
     
-    def __init__(self, data_dir: str = "data/raw"):
+    def __init__(self, data_dir: str = "data/raw", cache_dir: str = "data/processed",
+                 use_cache: bool = True, cache_max_bytes: Optional[int] = 1 << 30):
         self.data_dir = Path(data_dir)
         self.supported_formats = {'.txt', '.pdf', '.docx', '.md'}
+        self.cache = ExtractionCache(cache_dir, LOADER_VERSION, max_bytes=cache_max_bytes) if use_cache else None
     
     def load_txt(self, filepath: Path) -> str:
         """Load text file"""
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
     
-    def load_pdf(self, filepath: Path) -> str:
-        """Load PDF file"""
-        text = []
+    def load_pdf_pages(self, filepath: Path) -> List[str]:
+        """Load PDF file as a list of page texts"""
         with open(filepath, 'rb') as f:
             pdf_reader = PyPDF2.PdfReader(f)
-            for page in pdf_reader.pages:
-                text.append(page.extract_text())
-        return '\n'.join(text)
+            return [page.extract_text() or '' for page in pdf_reader.pages]
+    
+    def load_pdf(self, filepath: Path) -> str:
+        """Load PDF file"""
+        return '\n'.join(self.load_pdf_pages(filepath))
     
     def load_docx(self, filepath: Path) -> str:
         """Load DOCX file"""
-        doc = docx.Document(filepath)
-        return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+        return '\n'.join(text for _, text, _ in iter_docx_blocks(filepath))
+    
+    def _join_sections(self, parts: List[Tuple[str, str]]) -> Tuple[str, List[Dict]]:
+        """Join (title, text) parts with newlines, recording each part's char span"""
+        texts = []
+        sections = []
+        offset = 0
+        for title, part in parts:
+            part = normalize_text(part)
+            sections.append({'title': title, 'start': offset, 'end': offset + len(part)})
+            texts.append(part)
+            offset += len(part) + 1
+        return '\n'.join(texts), sections
+    
+    def _extract_markdown(self, text: str) -> List[Dict]:
+        """Split markdown into sections at heading lines"""
+        sections = []
+        offset = 0
+        title, start = '', 0
+        for line in text.splitlines(keepends=True):
+            if line.startswith('#') and offset > start:
+                sections.append({'title': title, 'start': start, 'end': offset})
+                start = offset
+            if line.startswith('#'):
+                title = line.lstrip('#').strip()
+            offset += len(line)
+        sections.append({'title': title, 'start': start, 'end': len(text)})
+        return sections
+    
+    def _extract_docx(self, filepath: Path) -> Tuple[str, List[Dict]]:
+        """Extract DOCX paragraphs and tables, grouping them into sections at headings"""
+        groups = [('', [])]
+        for kind, text, _ in iter_docx_blocks(filepath):
+            if kind == 'heading':
+                groups.append((text, []))
+            groups[-1][1].append(text)
+        parts = [(title, '\n'.join(lines)) for title, lines in groups if lines]
+        return self._join_sections(parts)
+    
+    def extract(self, filepath: Path) -> Tuple[str, List[Dict]]:
+        """Parse a file into normalized text plus page/section spans
+        
+        Text is normalized with normalize_text before any span is computed, so
+        spans index the text that is stored and chunked.
+        """
+        ext = filepath.suffix.lower()
+        
+        if ext == '.txt':
+            text = normalize_text(self.load_txt(filepath))
+            return text, [{'title': '', 'start': 0, 'end': len(text)}]
+        elif ext == '.md':
+            text = normalize_text(self.load_txt(filepath))
+            return text, self._extract_markdown(text)
+        elif ext == '.pdf':
+            pages = self.load_pdf_pages(filepath)
+            return self._join_sections([(f"Page {i}", page) for i, page in enumerate(pages, 1)])
+        elif ext == '.docx':
+            return self._extract_docx(filepath)
+        raise ValueError(f"Unsupported format: {ext}")
     
     def load_file(self, filepath: Path) -> Dict[str, str]:
         """Load a single file"""
+        # Indexed under its absolute path, however the caller spelled it
+        filepath = Path(filepath).resolve()
         ext = filepath.suffix.lower()
         
+        if ext not in self.supported_formats:
+            logger.warning(f"Unsupported format: {ext}")
+            return None
+        
         try:
-            if ext == '.txt' or ext == '.md':
-                text = self.load_txt(filepath)
-            elif ext == '.pdf':
-                text = self.load_pdf(filepath)
-            elif ext == '.docx':
-                text = self.load_docx(filepath)
-            else:
-                logger.warning(f"Unsupported format: {ext}")
-                return None
+            entry = None
+            if self.cache is not None:
+                cache_key = self.cache.key(filepath)
+                entry = self.cache.get(cache_key)
             
-            logger.info(f"Loaded: {filepath.name} ({len(text)} chars)")
+            if entry is None:
+                text, sections = self.extract(filepath)
+                entry = {'text': text, 'sections': sections}
+                if self.cache is not None:
+                    self.cache.put(cache_key, entry)
+                logger.info(f"Loaded: {filepath.name} ({len(text)} chars)")
+            else:
+                logger.info(f"Loaded from cache: {filepath.name} ({len(entry['text'])} chars)")
             
             return {
-                'text': text,
+                'text': entry['text'],
+                'sections': entry['sections'],
                 'source': filepath.name,
                 'path': str(filepath)
             }
@@ -72,5 +151,7 @@ class DocumentLoader:
                 if doc:
                     documents.append(doc)
         
+        if self.cache is not None:
+            logger.info(f"Extraction cache: {self.cache.hits} hits, {self.cache.misses} misses")
         logger.info(f"Loaded {len(documents)} documents from {directory}")
         return documents
\ No newline at end of file
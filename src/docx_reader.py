@@ -0,0 +1,125 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, IO, Iterator, Tuple
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_BODY, _P, _R, _T, _TAB, _BR, _CR = (W + tag for tag in ('body', 'p', 'r', 't', 'tab', 'br', 'cr'))
+_TBL, _TR, _TC = W + 'tbl', W + 'tr', W + 'tc'
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, per the package relationships"""
+    try:
+        rels = ET.fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        return 'word/document.xml'
+    for rel in rels.iter(_REL):
+        if rel.get('Type', '').endswith('/officeDocument'):
+            return rel.get('Target').lstrip('/')
+    return 'word/document.xml'
+
+def heading_levels(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """styleId -> level of every "Heading N" paragraph style"""
+    try:
+        styles = ET.fromstring(archive.read('word/styles.xml'))
+    except KeyError:
+        return {}
+    levels = {}
+    for style in styles.iter(f'{W}style'):
+        name = style.find(f'{W}name')
+        name = name.get(f'{W}val', '') if name is not None else ''
+        # Built-in names are lower case in styles.xml ("heading 1")
+        if name.lower().startswith('heading'):
+            digits = name[len('heading'):].strip()
+            levels[style.get(f'{W}styleId')] = int(digits) if digits.isdigit() else 1
+    return levels
+
+def _paragraph_text(paragraph: ET.Element) -> str:
+    """Visible run text of a paragraph; deleted text and field codes are skipped"""
+    parts = []
+    for run in paragraph.iter(_R):
+        for child in run:
+            if child.tag == _T:
+                parts.append(child.text or '')
+            elif child.tag == _TAB:
+                parts.append('\t')
+            elif child.tag in (_BR, _CR):
+                parts.append('\n')
+    return ''.join(parts)
+
+def _paragraph_style(paragraph: ET.Element) -> str:
+    style = paragraph.find(f'{W}pPr/{W}pStyle')
+    return style.get(f'{W}val', '') if style is not None else ''
+
+def iter_blocks(stream: IO[bytes], levels: Dict[str, int]) -> Iterator[Tuple[str, str, int]]:
+    """Yield (kind, text, level) for each body block of a document.xml stream
+
+    kind is 'heading', 'paragraph' or 'table'; level is the heading level, else 0.
+    Tables come out one row per line with cells joined by " | "; a nested table
+    is linearized into the cell that holds it as "[row ; row]". Each block is
+    cleared once read, so memory stays bounded by the largest paragraph or
+    table, not the document.
+    """
+    tables = []  # open tables, innermost last
+    fallback = 0
+    body = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if tag == _BODY:
+                body = element
+            elif tag == _MC_FALLBACK:
+                # Fallback markup repeats the preceding mc:Choice content
+                fallback += 1
+            elif tag == _TBL and not fallback:
+                tables.append({'rows': [], 'cells': [], 'lines': []})
+            continue
+
+        if tag == _MC_FALLBACK:
+            fallback -= 1
+            element.clear()
+            continue
+        if fallback:
+            continue
+
+        if tag == _P:
+            text = _paragraph_text(element)
+            if tables:
+                tables[-1]['lines'].append(text)
+            else:
+                level = levels.get(_paragraph_style(element), 0)
+                yield ('heading' if level else 'paragraph'), text, level
+            element.clear()
+        elif tag == _TC and tables:
+            table = tables[-1]
+            table['cells'].append(' '.join(line.strip() for line in table['lines'] if line.strip()))
+            table['lines'] = []
+        elif tag == _TR and tables:
+            table = tables[-1]
+            if any(table['cells']):
+                table['rows'].append(' | '.join(table['cells']))
+            table['cells'] = []
+        elif tag == _TBL and tables:
+            text = '\n'.join(tables.pop()['rows'])
+            if tables:
+                # Bracketed, so its cells stay apart from the enclosing row's
+                nested = text.replace('\n', ' ; ')
+                tables[-1]['lines'].append(f"[{nested}]" if nested else '')
+            elif text:
+                yield 'table', text, 0
+            element.clear()
+        else:
+            continue
+
+        # Drop finished blocks from the tree iterparse is building
+        if body is not None and not tables:
+            body.clear()
+
+def iter_docx_blocks(filepath: Path) -> Iterator[Tuple[str, str, int]]:
+    """Stream paragraphs, headings and tables of a .docx in document order"""
+    with zipfile.ZipFile(filepath) as archive:
+        levels = heading_levels(archive)
+        with archive.open(_main_part(archive)) as stream:
+            yield from iter_blocks(stream, levels)
@@ -0,0 +1,168 @@
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from loguru import logger
+
+# Per-process model, created once by the pool initializer
+_worker_model = None
+# Shared by all workers, so warm-up tasks land one per worker
+_worker_barrier = None
+# Thread caps read by OpenMP/MKL/OpenBLAS when torch is imported
+_THREAD_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def _init_worker(model_name: str, threads: int, cpu_sets, model_kwargs: Dict, barrier):
+    """Pin the worker to its own CPUs, cap intra-op threads, and load a model copy"""
+    global _worker_model, _worker_barrier
+    _worker_barrier = barrier
+
+    cpus = cpu_sets.get() if cpu_sets is not None else None
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+    # torch is already imported by now (unpickling this function imports src);
+    # the _THREAD_VARS caps come from the environment the parent spawned us with
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+    if model_kwargs.get('backend', 'torch') == 'torch':
+        import torch
+        torch.set_num_threads(threads)
+
+    from .embeddings import load_embedding_model
+    _worker_model = load_embedding_model(model_name, num_threads=threads, **model_kwargs)
+
+
+def _encode_batch(args) -> np.ndarray:
+    """Encode one shard inside a worker"""
+    texts, batch_size = args
+    embeddings = _worker_model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True
+    )
+    return embeddings.astype('float32')
+
+
+def _warm_worker(timeout: float) -> int:
+    """Run a first encode, then hold this worker until every worker has done the same"""
+    _worker_model.encode(['warm up'], show_progress_bar=False)
+    _worker_barrier.wait(timeout)
+    return os.getpid()
+
+
+class EmbeddingPool:
+    """Shard embedding work across worker processes, each with its own model copy"""
+
+    def __init__(self, model_name: str, num_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None, pin_threads: bool = True,
+                 model_kwargs: Optional[Dict] = None):
+        cpu_count = os.cpu_count() or 1
+        self.model_name = model_name
+        self.num_workers = num_workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.num_workers)
+        self.batch_size = 32
+        self.worker_pids: List[int] = []
+
+        ctx = mp.get_context('spawn')
+        cpu_sets = None
+        if pin_threads and hasattr(os, 'sched_getaffinity'):
+            available = sorted(os.sched_getaffinity(0))
+            if len(available) >= self.num_workers * self.threads_per_worker:
+                cpu_sets = ctx.Queue()
+                for w in range(self.num_workers):
+                    start = w * self.threads_per_worker
+                    cpu_sets.put(set(available[start:start + self.threads_per_worker]))
+
+        logger.info(f"Starting embedding pool: {self.num_workers} workers x "
+                    f"{self.threads_per_worker} threads")
+        # Workers inherit the environment at spawn, before anything in them runs
+        saved = {var: os.environ.get(var) for var in _THREAD_VARS}
+        os.environ.update({var: str(self.threads_per_worker) for var in _THREAD_VARS})
+        try:
+            self._pool = ctx.Pool(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(model_name, self.threads_per_worker, cpu_sets, model_kwargs or {},
+                          ctx.Barrier(self.num_workers))
+            )
+        finally:
+            for var, value in saved.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+    def warm(self, timeout: float = 600.0):
+        """Block until every worker has loaded its model and run one encode"""
+        start = time.perf_counter()
+        pids = self._pool.map(_warm_worker, [timeout] * self.num_workers, chunksize=1)
+        self.worker_pids = sorted(set(pids))
+        logger.info(f"Warmed {len(set(pids))} embedding workers in {time.perf_counter() - start:.1f}s")
+
+    def _shards(self, texts: Sequence[str], batch_size: int):
+        for i in range(0, len(texts), batch_size):
+            yield list(texts[i:i + batch_size]), batch_size
+
+    def iter_embed(self, texts: Sequence[str], batch_size: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Yield embeddings shard by shard, in input order"""
+        batch_size = batch_size or self.batch_size
+        yield from self._pool.imap(_encode_batch, self._shards(texts, batch_size))
+
+    def embed(self, texts: Sequence[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embed all texts and report throughput"""
+        start = time.perf_counter()
+        parts = list(self.iter_embed(texts, batch_size))
+        elapsed = time.perf_counter() - start
+
+        logger.info(f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+                    f"({len(texts) / max(elapsed, 1e-9):.1f} chunks/sec, {self.num_workers} workers)")
+        return np.vstack(parts) if parts else np.zeros((0, 0), dtype='float32')
+
+    def tune_batch_size(self, texts: Sequence[str],
+                        candidates: Sequence[int] = (8, 16, 32, 64, 128)) -> Tuple[int, np.ndarray]:
+        """Pick the batch size with the best measured throughput on the leading texts
+
+        Workers are warmed first, so model loading and first-call overhead are
+        not timed. Each candidate embeds the next slice of texts, so nothing is
+        encoded twice: returns the chosen size and the embeddings of the texts
+        that were used, which the caller keeps.
+        """
+        self.warm()
+        best_size, best_rate = self.batch_size, 0.0
+        parts = []
+        done = 0
+
+        for size in candidates:
+            # Enough work to keep every worker busy for a few shards
+            sample = texts[done:done + size * self.num_workers * 2]
+            if len(sample) < size * self.num_workers:
+                break
+
+            start = time.perf_counter()
+            parts.extend(self.iter_embed(sample, size))
+            rate = len(sample) / max(time.perf_counter() - start, 1e-9)
+            done += len(sample)
+            logger.debug(f"batch_size={size}: {rate:.1f} chunks/sec")
+
+            if rate <= best_rate:
+                break
+            best_size, best_rate = size, rate
+
+        self.batch_size = best_size
+        logger.info(f"Tuned embedding batch size: {best_size} ({best_rate:.1f} chunks/sec)")
+        embedded = np.vstack(parts) if parts else np.zeros((0, 0), dtype='float32')
+        return best_size, embedded
+
+    def close(self):
+        """Stop the worker processes"""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,28 +1,105 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List
+import time
+import threading
+from typing import List, Optional
 from loguru import logger
 
+from .embedding_pool import EmbeddingPool
+
+def load_embedding_model(model_name: str, backend: str = 'torch', quantize: bool = False,
+                         onnx_dir: str = "models/onnx", num_threads: Optional[int] = None):
+    """Load a sentence embedding model for the given inference backend"""
+    if backend == 'torch':
+        return SentenceTransformer(model_name, device='cpu' if num_threads else None)
+    elif backend == 'onnx':
+        from .onnx_backend import load_onnx_model
+        return load_onnx_model(model_name, onnx_dir, quantize=quantize, num_threads=num_threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
 class EmbeddingManager:
     """Manage text embeddings"""
     
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', num_workers: int = 1,
+                 min_pool_texts: int = 1024, backend: str = 'torch', quantize: bool = False,
+                 onnx_dir: str = "models/onnx", pool_idle_timeout: float = 60.0):
+        logger.info(f"Loading embedding model: {model_name} ({backend}{', int8' if quantize else ''})")
+        self.model_name = model_name
+        self.model_kwargs = {'backend': backend, 'quantize': quantize, 'onnx_dir': onnx_dir}
+        self.model = load_embedding_model(model_name, **self.model_kwargs)
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         logger.info(f"Embedding dimension: {self.embedding_dim}")
+        
+        # Multi-process pool for large ingest batches; started on first use and
+        # closed once idle for pool_idle_timeout seconds, since every worker holds
+        # a model copy
+        self.num_workers = num_workers
+        self.min_pool_texts = min_pool_texts
+        self.pool_idle_timeout = pool_idle_timeout
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self._idle_timer = None
+        self._batch_size = None  # tuned on the first pool, reused by later ones
+    
+    def _embed_pooled(self, texts: List[str]) -> np.ndarray:
+        """Embed on the worker pool; the first call starts it and tunes on these texts"""
+        with self._pool_lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            try:
+                if self.pool is not None:
+                    return self.pool.embed(texts)
+                
+                self.pool = EmbeddingPool(self.model_name, num_workers=self.num_workers,
+                                          model_kwargs=self.model_kwargs)
+                if self._batch_size is not None:
+                    self.pool.warm()
+                    self.pool.batch_size = self._batch_size
+                    return self.pool.embed(texts)
+                self._batch_size, head = self.pool.tune_batch_size(texts)
+                if len(head) == len(texts):
+                    return head
+                rest = self.pool.embed(texts[len(head):])
+                return np.vstack([head, rest]) if len(head) else rest
+            finally:
+                self._idle_timer = threading.Timer(self.pool_idle_timeout, self._close_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+    
+    def _close_idle(self):
+        with self._pool_lock:
+            if self.pool is not None:
+                logger.info(f"Closing embedding pool after {self.pool_idle_timeout:g}s idle")
+                self.pool.close()
+                self.pool = None
     
     def embed_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
         """Generate embeddings for multiple texts"""
+        if self.num_workers > 1 and len(texts) >= self.min_pool_texts:
+            return self._embed_pooled(texts)
+        
+        start = time.perf_counter()
         embeddings = self.model.encode(
             texts,
             batch_size=batch_size,
             show_progress_bar=True,
             convert_to_numpy=True
         )
+        elapsed = time.perf_counter() - start
+        logger.info(f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+                    f"({len(texts) / max(elapsed, 1e-9):.1f} chunks/sec)")
         return embeddings.astype('float32')
     
     def embed_query(self, query: str) -> np.ndarray:
         """Generate embedding for a single query"""
         embedding = self.model.encode([query], convert_to_numpy=True)
-        return embedding.astype('float32')
\ No newline at end of file
+        return embedding.astype('float32')
+    
+    def close(self):
+        """Shut down the embedding worker pool, if one is running"""
+        with self._pool_lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
@@ -0,0 +1,180 @@
+import re
+import json
+import math
+import time
+import itertools
+import numpy as np
+import faiss
+from typing import Dict, List, Optional, Sequence
+from loguru import logger
+
+from .embeddings import EmbeddingManager
+from .rag_chatbot import RAGChatbot
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+def load_dataset(path: str) -> List[Dict]:
+    """Read JSONL lines of {"question": str, "relevant_sources": [file names]}"""
+    dataset = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                dataset.append({'question': item['question'],
+                                'relevant_sources': list(item['relevant_sources'])})
+    return dataset
+
+def save_dataset(dataset: List[Dict], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in dataset:
+            f.write(json.dumps(item) + '\n')
+
+def generate_dataset(documents: List[Dict], questions_per_doc: int = 5,
+                     min_words: int = 8, max_words: int = 40, seed: int = 0) -> List[Dict]:
+    """Synthetic questions: sentences sampled from each document, labelled with it
+
+    Sentences are lifted verbatim, so absolute scores are optimistic; use the set
+    to compare configurations against each other, not as a quality estimate.
+    """
+    rng = np.random.default_rng(seed)
+    dataset = []
+    for doc in documents:
+        sentences = [s.strip() for s in _SENTENCE_RE.split(doc['text'])
+                     if min_words <= len(s.split()) <= max_words]
+        if not sentences:
+            continue
+        picks = rng.choice(len(sentences), size=min(questions_per_doc, len(sentences)), replace=False)
+        for i in sorted(picks):
+            dataset.append({'question': sentences[i], 'relevant_sources': [doc['source']]})
+    return dataset
+
+def result_sources(meta: Dict) -> List[str]:
+    """Sources a retrieved chunk stands for, including collapsed duplicates"""
+    return [meta['source']] + [ref['source'] for ref in meta.get('duplicates', ())]
+
+def score_ranking(ranked: List[List[str]], relevant: Sequence[str], k: int) -> Dict[str, float]:
+    """recall@k, reciprocal rank and nDCG@k with binary relevance per source
+
+    ranked holds the sources of each retrieved chunk, best first. A relevant
+    source counts once, at the first chunk it appears in.
+    """
+    relevant = set(relevant)
+    found = set()
+    dcg = 0.0
+    reciprocal_rank = 0.0
+    for rank, sources in enumerate(ranked[:k], 1):
+        hits = (relevant & set(sources)) - found
+        if hits and not found:
+            reciprocal_rank = 1.0 / rank
+        dcg += len(hits) / math.log2(rank + 1)
+        found |= hits
+
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return {
+        'recall': len(found) / len(relevant) if relevant else 0.0,
+        'mrr': reciprocal_rank,
+        'ndcg': dcg / ideal if ideal else 0.0
+    }
+
+def evaluate_config(documents: List[Dict], dataset: List[Dict], embedder: EmbeddingManager,
+                    chunk_size: int, chunk_overlap: int, metric: str,
+                    top_ks: Sequence[int]) -> List[Dict]:
+    """Build one index and score it at every top_k; one result row per top_k"""
+    chatbot = RAGChatbot(
+        nvidia_api_key="",
+        nvidia_api_url="http://localhost/unused",
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        metric=metric,
+        embedder=embedder
+    )
+
+    start = time.perf_counter()
+    chatbot.add_documents(documents)
+    build_seconds = time.perf_counter() - start
+    index_bytes = int(faiss.serialize_index(chatbot.index).nbytes)
+
+    rows = []
+    for k in top_ks:
+        chatbot.retrieve(dataset[0]['question'], k)  # warm-up
+        latencies = []
+        totals = {'recall': 0.0, 'mrr': 0.0, 'ndcg': 0.0}
+        for item in dataset:
+            t0 = time.perf_counter()
+            results = chatbot.retrieve(item['question'], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            ranked = [result_sources(meta) for _, meta, _ in results]
+            for name, value in score_ranking(ranked, item['relevant_sources'], k).items():
+                totals[name] += value
+
+        rows.append({
+            'chunk_size': chunk_size,
+            'chunk_overlap': chunk_overlap,
+            'metric': metric,
+            'top_k': k,
+            'recall': totals['recall'] / len(dataset),
+            'mrr': totals['mrr'] / len(dataset),
+            'ndcg': totals['ndcg'] / len(dataset),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'chunks': chatbot.chunk_count,
+            'index_bytes': index_bytes,
+            'build_seconds': build_seconds
+        })
+        logger.info(f"chunk_size={chunk_size} overlap={chunk_overlap} {metric} k={k}: "
+                    f"recall={rows[-1]['recall']:.3f} mrr={rows[-1]['mrr']:.3f} "
+                    f"p95={rows[-1]['p95_ms']:.1f}ms")
+    return rows
+
+def evaluate_grid(documents: List[Dict], dataset: List[Dict], chunk_sizes: Sequence[int],
+                  chunk_overlaps: Sequence[int], metrics: Sequence[str], top_ks: Sequence[int],
+                  embedder: Optional[EmbeddingManager] = None) -> List[Dict]:
+    """Score every combination; the embedding model is loaded once and shared"""
+    if not dataset:
+        raise ValueError("Evaluation dataset is empty")
+    embedder = embedder or EmbeddingManager()
+    rows = []
+    for chunk_size, overlap, metric in itertools.product(chunk_sizes, chunk_overlaps, metrics):
+        if overlap >= chunk_size:
+            logger.warning(f"Skipping chunk_size={chunk_size} overlap={overlap}")
+            continue
+        rows.extend(evaluate_config(documents, dataset, embedder, chunk_size, overlap, metric, top_ks))
+    return rows
+
+def config_key(row: Dict) -> tuple:
+    return row['chunk_size'], row['chunk_overlap'], row['metric'], row['top_k']
+
+def check_regressions(rows: List[Dict], thresholds: Dict,
+                      baseline: Optional[List[Dict]] = None) -> List[str]:
+    """Describe every threshold a result row violates; empty when all pass
+
+    thresholds may set absolute floors/ceilings (min_recall, min_mrr, min_ndcg,
+    max_p95_ms, max_build_seconds, max_index_bytes) and, against a baseline run,
+    the largest allowed drop in quality (max_quality_drop, absolute) and growth
+    in p95 latency (max_latency_increase, fractional).
+    """
+    failures = []
+    limits = [('min_recall', 'recall', 1), ('min_mrr', 'mrr', 1), ('min_ndcg', 'ndcg', 1),
+              ('max_p95_ms', 'p95_ms', -1), ('max_build_seconds', 'build_seconds', -1),
+              ('max_index_bytes', 'index_bytes', -1)]
+    previous = {config_key(row): row for row in baseline or []}
+
+    for row in rows:
+        label = "chunk_size={} overlap={} metric={} k={}".format(*config_key(row))
+        for name, field, direction in limits:
+            limit = thresholds.get(name)
+            if limit is not None and (row[field] - limit) * direction < 0:
+                failures.append(f"{label}: {field} {row[field]:.4g} violates {name}={limit}")
+
+        before = previous.get(config_key(row))
+        if before is None:
+            continue
+        max_drop = thresholds.get('max_quality_drop')
+        if max_drop is not None:
+            for field in ('recall', 'mrr', 'ndcg'):
+                if before[field] - row[field] > max_drop:
+                    failures.append(f"{label}: {field} fell {before[field]:.4f} -> {row[field]:.4f}")
+        max_increase = thresholds.get('max_latency_increase')
+        if max_increase is not None and row['p95_ms'] > before['p95_ms'] * (1 + max_increase):
+            failures.append(f"{label}: p95 rose {before['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms")
+    return failures
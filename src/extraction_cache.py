@@ -0,0 +1,125 @@
+import os
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+from loguru import logger
+
+
+class ExtractionCache:
+    """Cache parsed document text on disk, keyed by content hash, format and loader version
+
+    Entries from other loader versions are deleted, and the least recently used
+    ones are evicted once the cache exceeds max_bytes. That check runs on start
+    and every prune_every writes.
+    """
+
+    def __init__(self, cache_dir: str = "data/processed", loader_version: int = 1,
+                 max_bytes: Optional[int] = 1 << 30, prune_every: int = 256):
+        self.cache_dir = Path(cache_dir)
+        self.loader_version = loader_version
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self.prune()
+
+    @staticmethod
+    def hash_file(filepath: Path, block_size: int = 1 << 20) -> str:
+        """Compute SHA-256 of the file contents"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, filepath: Path) -> str:
+        """Content hash plus format: identical bytes parse differently as .txt and .md"""
+        return f"{self.hash_file(filepath)}.{filepath.suffix.lower().lstrip('.')}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.v{self.loader_version}.json.gz"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached extraction for a key, or None on a miss"""
+        path = self._entry_path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            # mtime is the recency prune() evicts by
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        """Store an extraction result; written atomically so readers never see partial files"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path.name}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete other versions' entries, then evict least recently used ones over max_bytes"""
+        suffix = f".v{self.loader_version}.json.gz"
+        current = []
+        removed = 0
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+
+        for entry in entries:
+            if not entry.name.endswith('.json.gz'):
+                continue
+            try:
+                if not entry.name.endswith(suffix):
+                    os.unlink(entry.path)
+                    removed += 1
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            current.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in current)
+        if self.max_bytes is not None and total > self.max_bytes:
+            for _, size, path in sorted(current):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f"Extraction cache: pruned {removed} entries ({total / 1e6:.1f} MB kept)")
+        return removed
@@ -0,0 +1,155 @@
+import time
+import queue
+import itertools
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+from .document_loader import DocumentLoader
+from .rag_chatbot import RAGChatbot
+
+class IngestJob:
+    """Progress of one batch of files moving through the ingest worker"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, paths: List[str]):
+        self.id = next(self._ids)
+        self.paths = [Path(p) for p in paths]
+        self.state = 'queued'
+        self.files_done = 0
+        self.chunks_added = 0
+        self.current_file = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def status(self) -> Dict:
+        """Consistent snapshot of progress, throughput and ETA"""
+        with self._lock:
+            total = len(self.paths)
+            elapsed = 0.0
+            if self.started_at is not None:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+
+            throughput = self.files_done / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self.state == 'running' and throughput > 0:
+                eta = (total - self.files_done) / throughput
+
+            return {
+                'id': self.id,
+                'state': self.state,
+                'files_total': total,
+                'files_done': self.files_done,
+                'current_file': self.current_file,
+                'chunks_added': self.chunks_added,
+                'files_per_sec': throughput,
+                'eta_seconds': eta,
+                'elapsed_seconds': elapsed,
+                'error': self.error
+            }
+
+class IngestWorker:
+    """Parse and index files on a background thread, publishing one batch at a time"""
+
+    def __init__(self, chatbot: RAGChatbot, loader: Optional[DocumentLoader] = None,
+                 index_path: Optional[str] = None, batch_files: int = 8):
+        self.chatbot = chatbot
+        self.loader = loader or DocumentLoader()
+        self.index_path = index_path
+        self.batch_files = batch_files
+        self.jobs: Dict[int, IngestJob] = {}
+
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, paths: List[str]) -> IngestJob:
+        """Queue files for ingestion; returns immediately"""
+        job = IngestJob(paths)
+        self.jobs[job.id] = job
+        self._queue.put(job)
+        logger.info(f"Queued ingest job {job.id} ({len(job.paths)} files)")
+        return job
+
+    def active_jobs(self) -> List[IngestJob]:
+        return [job for job in self.jobs.values() if job.state in ('queued', 'running')]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.error(f"Ingest job {job.id} failed: {e}")
+                job.update(state='failed', error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
+
+    def _process(self, job: IngestJob):
+        job.update(state='running', started_at=time.time())
+        batch = []
+
+        for i, path in enumerate(job.paths, 1):
+            if self._cancelled.is_set():
+                job.update(state='cancelled', current_file=None, finished_at=time.time())
+                logger.info(f"Ingest job {job.id} cancelled after {i - 1} files")
+                return
+            job.update(current_file=path.name)
+            doc = self.loader.load_file(path)
+            if doc:
+                batch.append(doc)
+
+            if len(batch) >= self.batch_files or i == len(job.paths):
+                self._publish(job, batch)
+                batch = []
+            job.update(files_done=i)
+
+        if job.chunks_added:
+            # Re-derive the relevance cut-off from the corpus unless one was configured
+            chatbot = self.chatbot
+            chatbot.auto_calibrate()
+            if self.index_path:
+                chatbot.save_index(self.index_path)
+
+        job.update(state='done', current_file=None, finished_at=time.time())
+        status = job.status()
+        logger.info(f"Ingest job {job.id} done: {status['files_done']} files, "
+                    f"{status['chunks_added']} chunks in {status['elapsed_seconds']:.1f}s")
+
+    def _publish(self, job: IngestJob, batch: List[Dict]):
+        """Index a batch; chat keeps using the previous snapshot until this returns"""
+        if not batch:
+            return
+        # A re-submitted file replaces its previous chunks instead of duplicating them
+        added = self.chatbot.add_documents(batch, replace=True)
+        job.update(chunks_added=job.chunks_added + added)
+
+    def stop(self, cancel: bool = False):
+        """Stop the worker thread once queued jobs finish
+
+        With cancel, queued jobs are dropped and the running job stops at the next
+        file without saving the index.
+        """
+        if cancel:
+            self._cancelled.set()
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                job.update(state='cancelled', finished_at=time.time())
+                self._queue.task_done()
+        self._queue.put(None)
+        self._thread.join()
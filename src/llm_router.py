@@ -0,0 +1,328 @@
+import json
+import time
+import queue
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import requests
+from loguru import logger
+
+class LLMUnavailableError(Exception):
+    """No endpoint could serve the request"""
+
+class LLMEndpoint:
+    """One OpenAI-compatible chat completions endpoint and its observed health"""
+
+    def __init__(self, url: str, model: str, api_key: str = "", ewma_alpha: float = 0.2,
+                 failure_threshold: int = 3, cooldown: float = 30.0, window: int = 200):
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.wins = 0
+        # Past the cooldown a tripped circuit lets a single trial request through
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.url}"
+
+    def available(self, now: float) -> bool:
+        """Closed circuit, or past its cooldown with no half-open trial in flight"""
+        with self._lock:
+            return now >= self.open_until and not self._trial
+
+    def acquire(self, now: float) -> bool:
+        """Claim the endpoint for one request; a half-open circuit admits only one"""
+        with self._lock:
+            if now < self.open_until or self._trial:
+                return False
+            if self.consecutive_failures >= self.failure_threshold:
+                self._trial = True
+            return True
+
+    def score(self, prior: float) -> float:
+        """Expected latency penalized by error rate
+
+        Untried endpoints are assumed to be as slow as prior, so they are tried
+        without taking all traffic before they have a latency of their own.
+        """
+        latency = self.ewma_latency if self.ewma_latency is not None else prior
+        return latency / max(1.0 - self.error_rate, 0.05)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < 10:
+                return None
+            return float(np.percentile(self.latencies, percentile))
+
+    def _observe_latency(self, latency: float):
+        self.latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self._observe_latency(latency)
+            self.error_rate *= 1 - self.ewma_alpha
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            self._trial = False
+
+    def record_cancelled(self, elapsed: float):
+        """A hedge loser took at least elapsed; count that so slow endpoints sink"""
+        with self._lock:
+            self.requests += 1
+            self._observe_latency(elapsed)
+            self._trial = False
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.requests += 1
+            self.error_rate += self.ewma_alpha * (1.0 - self.error_rate)
+            self.consecutive_failures += 1
+            self._trial = False
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.time() + self.cooldown
+                logger.warning(f"Circuit open for {self.name} ({self.cooldown:.0f}s)")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'wins': self.wins,
+                'ewma_latency_ms': None if self.ewma_latency is None else self.ewma_latency * 1000,
+                'error_rate': self.error_rate,
+                'circuit_open': time.time() < self.open_until
+            }
+
+class _Attempt:
+    """One in-flight request, run on its own thread and reporting into a shared queue"""
+
+    def __init__(self, endpoint: LLMEndpoint, payload: Dict, stream: bool,
+                 events: queue.Queue, timeout: float):
+        self.endpoint = endpoint
+        self.payload = dict(payload, model=endpoint.model, stream=stream)
+        self.stream = stream
+        self.events = events
+        self.timeout = timeout
+        self.hedged = False
+        self.cancelled = threading.Event()
+        self.response = None
+        self.first_token = False
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _iter_content(self, response) -> Iterator[str]:
+        if not self.stream:
+            yield response.json()['choices'][0]['message']['content']
+            return
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+            delta = json.loads(data)['choices'][0].get('delta', {})
+            if delta.get('content'):
+                yield delta['content']
+
+    def _run(self):
+        start = self.started
+        first = True
+        try:
+            self.response = requests.post(
+                self.endpoint.url,
+                headers={
+                    "Authorization": f"Bearer {self.endpoint.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=self.payload,
+                timeout=self.timeout,
+                stream=True
+            )
+            if self.cancelled.is_set():
+                return
+            self.response.raise_for_status()
+
+            for content in self._iter_content(self.response):
+                if self.cancelled.is_set():
+                    return
+                if first:
+                    # Time to first token drives routing and hedge deadlines
+                    self.endpoint.record_success(time.perf_counter() - start)
+                    first = False
+                    self.first_token = True
+                self.events.put((self, 'token', content))
+            if first:
+                # An empty answer still counts as the endpoint responding
+                self.endpoint.record_success(time.perf_counter() - start)
+            self.events.put((self, 'done', None))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                if first:
+                    self.endpoint.record_failure()
+                self.events.put((self, 'error', e))
+        finally:
+            if self.response is not None:
+                self.response.close()
+
+    def cancel(self):
+        if not self.cancelled.is_set() and not self.first_token:
+            self.endpoint.record_cancelled(time.perf_counter() - self.started)
+        self.cancelled.set()
+        if self.response is not None:
+            self.response.close()
+
+class LLMRouter:
+    """Route chat completions across endpoints by EWMA latency, with optional hedging"""
+
+    def __init__(self, endpoints: List[LLMEndpoint], hedge: bool = False,
+                 hedge_percentile: float = 95.0, default_hedge_delay: float = 2.0,
+                 timeout: float = 30.0):
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.timeout = timeout
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def rank(self) -> List[LLMEndpoint]:
+        """Endpoints in rotation, best first; all of them if every circuit is open"""
+        now = time.time()
+        healthy = [ep for ep in self.endpoints if ep.available(now)]
+        observed = [ep.ewma_latency for ep in self.endpoints if ep.ewma_latency is not None]
+        prior = max(observed) if observed else self.default_hedge_delay
+        return sorted(healthy or self.endpoints, key=lambda ep: ep.score(prior))
+
+    def hedge_delay(self, endpoint: LLMEndpoint) -> float:
+        """Wait this long for a first token before sending a duplicate elsewhere"""
+        delay = endpoint.latency_percentile(self.hedge_percentile)
+        return delay if delay is not None else self.default_hedge_delay
+
+    def _launch(self, candidates: List[LLMEndpoint], start: int, payload: Dict, stream: bool,
+                events: queue.Queue, force: bool = False) -> Tuple[Optional[_Attempt], int]:
+        """Start a request on the first candidate from start that admits one
+
+        Returns the attempt (None if none would) and the next candidate to try.
+        With force, the first candidate is used even if its circuit is open.
+        """
+        now = time.time()
+        for i in range(start, len(candidates)):
+            if candidates[i].acquire(now):
+                return _Attempt(candidates[i], payload, stream, events, self.timeout), i + 1
+        if force and start < len(candidates):
+            return _Attempt(candidates[start], payload, stream, events, self.timeout), start + 1
+        return None, len(candidates)
+
+    def _run(self, payload: Dict, stream: bool) -> Iterator[str]:
+        candidates = self.rank()
+        events = queue.Queue()
+        first, next_candidate = self._launch(candidates, 0, payload, stream, events, force=True)
+        attempts = [first]
+        winner = None
+        hedge_at = None
+        if self.hedge and len(candidates) > 1:
+            hedge_at = time.perf_counter() + self.hedge_delay(candidates[0])
+
+        try:
+            while True:
+                can_hedge = winner is None and hedge_at is not None and next_candidate < len(candidates)
+                wait = max(hedge_at - time.perf_counter(), 0.0) if can_hedge else self.timeout
+                try:
+                    attempt, kind, value = events.get(timeout=wait)
+                except queue.Empty:
+                    if can_hedge:
+                        # Primary is slow: race a duplicate on the next-best endpoint
+                        hedge, next_candidate = self._launch(candidates, next_candidate, payload,
+                                                             stream, events)
+                        hedge_at = None
+                        if hedge is not None:
+                            hedge.hedged = True
+                            attempts.append(hedge)
+                            with self._lock:
+                                self.hedged_requests += 1
+                        continue
+                    raise LLMUnavailableError(f"No response within {self.timeout:.0f}s")
+
+                if winner is None:
+                    if kind == 'error':
+                        logger.warning(f"LLM endpoint {attempt.endpoint.name} failed: {value}")
+                        attempts.remove(attempt)
+                        if not attempts or (self.hedge and next_candidate < len(candidates)):
+                            # Fail over to the next endpoint in rotation
+                            retry, next_candidate = self._launch(candidates, next_candidate, payload,
+                                                                 stream, events, force=not attempts)
+                            if retry is not None:
+                                attempts.append(retry)
+                            elif not attempts:
+                                raise LLMUnavailableError(str(value))
+                        continue
+                    winner = attempt
+                    winner.endpoint.record_win()
+                    if winner.hedged:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for other in attempts:
+                        if other is not winner:
+                            other.cancel()
+
+                if attempt is not winner:
+                    continue
+                if kind == 'token':
+                    yield value
+                elif kind == 'done':
+                    return
+                else:
+                    raise LLMUnavailableError(f"{attempt.endpoint.name} failed mid-response: {value}")
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+
+    def complete(self, payload: Dict) -> str:
+        """Non-streaming completion; returns the message content"""
+        return ''.join(self._run(payload, stream=False))
+
+    def stream(self, payload: Dict) -> Iterator[str]:
+        """Streaming completion; yields content deltas from the winning endpoint"""
+        return self._run(payload, stream=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = {'hedged_requests': self.hedged_requests, 'hedge_wins': self.hedge_wins}
+        return {
+            **counters,
+            'endpoints': {ep.name: ep.stats() for ep in self.endpoints}
+        }
+
+def parse_endpoints(spec: Union[str, List[Dict]], default_api_key: str = "") -> List[LLMEndpoint]:
+    """Build endpoints from a list of {"url", "model", "api_key"} objects, or its JSON"""
+    items = json.loads(spec) if isinstance(spec, str) else spec
+    return [
+        LLMEndpoint(item['url'], item['model'], item.get('api_key', default_api_key))
+        for item in items
+    ]
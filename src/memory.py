@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import numpy as np
+import faiss
+from typing import Dict, Optional, Sequence, Union
+
+from .dedup import MinHashDeduplicator
+from .metadata import ChunkTable
+
+_CONTAINERS = (list, tuple, set, frozenset)
+
+def deep_sizeof(obj) -> int:
+    """Bytes held by obj and everything it references, each object counted once
+
+    Walks every element, so it is O(size of obj); meant for diagnostics, not hot paths.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+        elif isinstance(item, np.ndarray):
+            # getsizeof already includes the buffer when the array owns it
+            if item.base is not None and not item.flags.owndata:
+                stack.append(item.base)
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.append(item.__dict__)
+    return total
+
+def strings_bytes(strings: Sequence[str]) -> int:
+    """Bytes of a list of strings and the strings themselves, without a generic walk"""
+    return sys.getsizeof(strings) + sum(map(sys.getsizeof, strings))
+
+def index_bytes(index: faiss.Index) -> int:
+    """Bytes of vector storage in a FAISS index"""
+    code_size = getattr(index, 'code_size', None)
+    if code_size is not None:
+        return int(index.ntotal * code_size)
+    return int(faiss.serialize_index(index).nbytes)
+
+def model_bytes(model) -> int:
+    """Weights of a SentenceTransformer (torch) or ONNX embedding model"""
+    if hasattr(model, 'parameters'):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return int(sum(t.numel() * t.element_size() for t in tensors))
+    model_path = getattr(model, 'model_path', None)
+    if model_path is not None and os.path.exists(model_path):
+        return os.path.getsize(model_path)
+    return 0
+
+def process_rss(pid: Union[int, str] = 'self') -> Optional[int]:
+    """Current resident set size of a process (this one by default), where /proc is available"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _chunk_counts(tokens: np.ndarray, chunk_size: int, chunk_overlap: int) -> np.ndarray:
+    """Chunks TextChunker.chunk_by_tokens makes from texts of these token lengths"""
+    extra = np.ceil((tokens - chunk_size) / (chunk_size - chunk_overlap)).astype(np.int64)
+    return np.where(tokens <= chunk_size, 1, extra + 1)
+
+def _sample_table(docs: int, chunks_per_doc: int, source_chars: int, path_chars: int) -> ChunkTable:
+    """Metadata table shaped like RAGChatbot.add_documents builds, spare capacity included"""
+    metadata = []
+    for doc_idx in range(docs):
+        source = str(doc_idx).rjust(source_chars, 's')
+        path = str(doc_idx).rjust(path_chars, 'p')
+        for chunk_idx in range(chunks_per_doc):
+            metadata.append({'source': source, 'chunk_id': chunk_idx, 'doc_id': doc_idx, 'path': path})
+    return ChunkTable.empty().append(metadata)
+
+def plan_capacity(doc_tokens: Sequence[int], chunk_size: int = 500, chunk_overlap: int = 50,
+                  embedding_dim: int = 384, parent_chunk_size: Optional[int] = None,
+                  chars_per_token: float = 4.0, dedup: bool = False, dedup_ratio: float = 0.0,
+                  chunks_per_sec: Optional[float] = None,
+                  dedup_chunks_per_sec: Optional[float] = None, model_size: int = 0,
+                  avg_source_chars: int = 24, avg_path_chars: int = 48) -> Dict:
+    """Predict RAM, disk and build time for indexing documents of these token lengths
+
+    Assumes a flat index. Per-item Python overheads are measured on sample objects
+    in this interpreter, then scaled to the corpus. Text is assumed mostly ASCII
+    (1 byte per char in memory and on disk); other scripts cost 2-4x as much.
+    """
+    hierarchical = bool(parent_chunk_size)
+    tokens = np.maximum(np.asarray(doc_tokens, dtype=np.int64), 1)
+    num_docs = len(tokens)
+
+    # Chunks per document; children never cross parent boundaries
+    if hierarchical:
+        parents = np.ceil(tokens / parent_chunk_size).astype(np.int64)
+        parent_tokens = np.ceil(tokens / parents).astype(np.int64)
+        per_parent = _chunk_counts(parent_tokens, chunk_size, chunk_overlap)
+        chunks = parents * per_parent
+        chunk_tokens = tokens + parents * chunk_overlap * (per_parent - 1)
+    else:
+        chunks = _chunk_counts(tokens, chunk_size, chunk_overlap)
+        chunk_tokens = tokens + chunk_overlap * (chunks - 1)
+
+    chunks_total = int(chunks.sum())
+    indexed = int(round(chunks_total * (1 - dedup_ratio)))
+    chunk_chars = float(chunk_tokens.sum()) * chars_per_token * (1 - dedup_ratio)
+    doc_chars = float(tokens.sum()) * chars_per_token
+
+    # Measured per-item overheads
+    str_header = sys.getsizeof('')
+    # Marginal cost of one more row, and of one more document's interned strings
+    def sample(docs, chunks):
+        table = _sample_table(docs, chunks, avg_source_chars, avg_path_chars)
+        return table.nbytes, len(json.dumps(table.to_json()))
+    # Large enough that columns outgrow their minimum capacity
+    base, more_rows, more_docs = sample(8, 256), sample(8, 512), sample(16, 256)
+    row_bytes = (more_rows[0] - base[0]) / 2048
+    row_json = (more_rows[1] - base[1]) / 2048
+    doc_meta_bytes = (more_docs[0] - base[0] - 2048 * row_bytes) / 8
+    # Collapsed chunks are kept as duplicate-reference dicts on the surviving row
+    ref = {'source': 's', 'path': 'p', 'chunk_id': 1, 'doc_id': 1}
+    ref_bytes = sys.getsizeof(ref) + 8
+    ref_json = len(json.dumps(ref)) + avg_source_chars + avg_path_chars
+
+    ram = {
+        'index': indexed * embedding_dim * 4,
+        'chunks': indexed * (str_header + 8) + chunk_chars,
+        'metadata': indexed * row_bytes + (chunks_total - indexed) * ref_bytes + num_docs * doc_meta_bytes,
+        'texts': num_docs * (str_header + 100) + doc_chars if hierarchical else 0,
+        'dedup': 0,
+        'model': model_size
+    }
+    if dedup:
+        rng = np.random.default_rng(0)
+        def probe(items):
+            dedup = MinHashDeduplicator()
+            for item_id in range(items):
+                dedup.add(item_id, rng.integers(0, 1 << 32, dedup.num_perm, dtype=np.uint32))
+            return deep_sizeof(dedup)
+        # Both sizes sit part way into a doubling, so spare capacity is included
+        ram['dedup'] = indexed * (probe(3072) - probe(1536)) / 1536
+    ram = {name: int(value) for name, value in ram.items()}
+    ram['total'] = sum(ram.values())
+    # Growing the index storage (or compacting it) briefly holds the vectors twice
+    ram['peak_build'] = ram['total'] + ram['index']
+
+    disk = {
+        'index': ram['index'] + 64,
+        # Collapsed chunks persist only as duplicate references in metadata
+        'meta': int(chunk_chars + indexed * (4 + row_json) + (chunks_total - indexed) * ref_json
+                    + (doc_chars + num_docs * 16 if hierarchical else 0))
+    }
+    disk['total'] = disk['index'] + disk['meta']
+
+    build_seconds = None
+    if chunks_per_sec:
+        build_seconds = indexed / chunks_per_sec
+        if dedup and dedup_chunks_per_sec:
+            # Every chunk is signed and looked up, collapsed or not
+            build_seconds += chunks_total / dedup_chunks_per_sec
+
+    return {
+        'documents': num_docs,
+        'chunks': chunks_total,
+        'indexed_chunks': indexed,
+        'ram_bytes': ram,
+        'disk_bytes': disk,
+        'build_seconds': build_seconds
+    }
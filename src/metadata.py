@@ -0,0 +1,375 @@
+import sys
+import numpy as np
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Set
+
+class StringPool:
+    """Append-only interning of source names and paths
+
+    Ids are stable, so snapshots built on one pool keep resolving correctly
+    while later snapshots add strings. ChunkTable.take() starts a fresh pool,
+    which is how names of deleted files are eventually dropped.
+    """
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self.ids: Dict[str, int] = {value: i for i, value in enumerate(self.values)}
+
+    def intern(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+    def lookup(self, values) -> np.ndarray:
+        """Ids of the given strings that are in the pool"""
+        return np.array([self.ids[v] for v in values if v in self.ids], dtype=np.int32)
+
+def normalize_path(path) -> str:
+    """Absolute, symlink-free form a file path is indexed and matched under"""
+    return str(Path(path).resolve())
+
+_DTYPES = {'source_ids': np.int32, 'path_ids': np.int32, 'chunk_ids': np.int32, 'doc_ids': np.int32,
+           'text_ids': np.int64, 'starts': np.int64, 'ends': np.int64}
+
+class _ColumnStore:
+    """Column arrays with spare capacity; tables are views of their first rows
+
+    filled is the row count of the table that last wrote here. Only that table
+    may append in place; appending from any other copies first.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], filled: int):
+        self.arrays = arrays
+        self.filled = filled
+
+    @property
+    def capacity(self) -> int:
+        return len(self.arrays['source_ids'])
+
+    def grown(self, rows: int, capacity: int) -> '_ColumnStore':
+        """New store holding a copy of the first rows, with room for capacity rows"""
+        arrays = {}
+        for name, dtype in _DTYPES.items():
+            arrays[name] = np.empty(capacity, dtype=dtype)
+            arrays[name][:rows] = self.arrays[name][:rows]
+        return _ColumnStore(arrays, rows)
+
+class ChunkTable:
+    """Immutable, columnar chunk metadata
+
+    Row i describes chunk i. Source and path strings are interned; chunk_id,
+    doc_id and parent offsets live in numpy columns. Indexing a row returns the
+    dict the chatbot has always exposed: source, chunk_id, doc_id and, when set,
+    path, parent and duplicates. Duplicate references are rare and stay dicts.
+
+    Rows are never rewritten. append() fills spare capacity in place, so a batch
+    costs O(batch) amortized; delete() marks rows deleted so ids stay stable
+    until take() compacts. Deleted rows still resolve, for readers holding an
+    older snapshot, but no longer count as indexed. Writers must be serialized.
+    """
+
+    def __init__(self, pool: StringPool, source_ids: np.ndarray, path_ids: np.ndarray,
+                 chunk_ids: np.ndarray, doc_ids: np.ndarray, text_ids: np.ndarray,
+                 starts: np.ndarray, ends: np.ndarray,
+                 duplicates: Optional[Dict[int, List[Dict]]] = None,
+                 deleted: FrozenSet[int] = frozenset(),
+                 row_counts: Optional[np.ndarray] = None,
+                 store: Optional[_ColumnStore] = None):
+        self.pool = pool
+        self.source_ids = source_ids
+        self.path_ids = path_ids
+        self.chunk_ids = chunk_ids
+        self.doc_ids = doc_ids
+        self.text_ids = text_ids
+        self.starts = starts
+        self.ends = ends
+        self.duplicates = duplicates or {}
+        self.deleted = deleted
+        self._store = store or _ColumnStore(self._columns(), len(source_ids))
+        self._live_mask = None
+
+        # Live chunks per source string id, maintained incrementally by append/delete
+        if row_counts is None:
+            row_counts = np.bincount(source_ids[self.live_mask()], minlength=len(pool.values))
+        self.row_counts = row_counts
+        self._source_counts = None
+        self._sources = None
+
+    @classmethod
+    def empty(cls, pool: Optional[StringPool] = None) -> 'ChunkTable':
+        return cls.from_dicts([], pool)
+
+    @classmethod
+    def from_dicts(cls, metadata: Sequence[Dict], pool: Optional[StringPool] = None) -> 'ChunkTable':
+        """Build a table from per-chunk dicts shaped like the rows it returns"""
+        pool = pool or StringPool()
+        n = len(metadata)
+        columns = {name: np.empty(n, dtype=dtype) for name, dtype in _DTYPES.items()}
+        duplicates = {}
+        for row, meta in enumerate(metadata):
+            cls._write_row(pool, columns, row, meta)
+            if meta.get('duplicates'):
+                duplicates[row] = cls._intern_refs(pool, meta['duplicates'])
+        return cls(pool, duplicates=duplicates, **columns)
+
+    @staticmethod
+    def _write_row(pool: StringPool, columns: Dict[str, np.ndarray], row: int, meta: Dict):
+        columns['source_ids'][row] = pool.intern(meta['source'])
+        columns['path_ids'][row] = pool.intern(meta['path']) if 'path' in meta else -1
+        columns['chunk_ids'][row] = meta['chunk_id']
+        columns['doc_ids'][row] = meta['doc_id']
+        parent = meta.get('parent')
+        if parent is not None:
+            columns['text_ids'][row] = parent['text_id']
+            columns['starts'][row] = parent['start']
+            columns['ends'][row] = parent['end']
+        else:
+            columns['text_ids'][row] = -1
+            columns['starts'][row] = 0
+            columns['ends'][row] = 0
+
+    @staticmethod
+    def _intern_refs(pool: StringPool, refs: List[Dict]) -> List[Dict]:
+        # Share the pooled strings instead of keeping a copy per reference
+        interned = []
+        for ref in refs:
+            ref = dict(ref, source=pool.values[pool.intern(ref['source'])])
+            if 'path' in ref:
+                ref['path'] = pool.values[pool.intern(ref['path'])]
+            interned.append(ref)
+        return interned
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {
+            'source_ids': self.source_ids, 'path_ids': self.path_ids,
+            'chunk_ids': self.chunk_ids, 'doc_ids': self.doc_ids,
+            'text_ids': self.text_ids, 'starts': self.starts, 'ends': self.ends
+        }
+
+    def __len__(self) -> int:
+        """Rows, deleted ones included; row ids run from 0 to len - 1"""
+        return len(self.source_ids)
+
+    def __bool__(self) -> bool:
+        return self.live_count > 0
+
+    @property
+    def live_count(self) -> int:
+        return len(self) - len(self.deleted)
+
+    def live_mask(self) -> np.ndarray:
+        if self._live_mask is None:
+            mask = np.ones(len(self), dtype=bool)
+            if self.deleted:
+                mask[np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))] = False
+            self._live_mask = mask
+        return self._live_mask
+
+    def __getitem__(self, row: int) -> Dict:
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        row = int(row) % len(self)
+        values = self.pool.values
+        meta = {
+            'source': values[self.source_ids[row]],
+            'chunk_id': int(self.chunk_ids[row]),
+            'doc_id': int(self.doc_ids[row])
+        }
+        if self.path_ids[row] >= 0:
+            meta['path'] = values[self.path_ids[row]]
+        if self.text_ids[row] >= 0:
+            meta['parent'] = {
+                'text_id': int(self.text_ids[row]),
+                'start': int(self.starts[row]),
+                'end': int(self.ends[row])
+            }
+        if row in self.duplicates:
+            meta['duplicates'] = [dict(ref) for ref in self.duplicates[row]]
+        return meta
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def append(self, metadata: Sequence[Dict]) -> 'ChunkTable':
+        """New table with rows for metadata added at the end"""
+        if not metadata:
+            return self
+        batch = ChunkTable.from_dicts(metadata, self.pool)
+        n, size = len(self), len(self) + len(batch)
+        store = self._store
+        if store.filled != n or store.capacity < size:
+            store = store.grown(n, max(2 * size, 1024))
+        for name, column in batch._columns().items():
+            store.arrays[name][n:size] = column
+        store.filled = size
+
+        duplicates = dict(self.duplicates)
+        duplicates.update({n + row: refs for row, refs in batch.duplicates.items()})
+        counts = self._pad(self.row_counts)
+        counts[:len(batch.row_counts)] += batch.row_counts
+        columns = {name: array[:size] for name, array in store.arrays.items()}
+        return ChunkTable(self.pool, duplicates=duplicates, deleted=self.deleted,
+                          row_counts=counts, store=store, **columns)
+
+    def with_duplicates(self, updates: Dict[int, List[Dict]]) -> 'ChunkTable':
+        """New table with the duplicate references of these rows replaced"""
+        if not updates:
+            return self
+        duplicates = dict(self.duplicates)
+        for row, refs in updates.items():
+            if refs:
+                duplicates[row] = self._intern_refs(self.pool, refs)
+            else:
+                duplicates.pop(row, None)
+        return ChunkTable(self.pool, duplicates=duplicates, deleted=self.deleted,
+                          row_counts=self.row_counts, store=self._store, **self._columns())
+
+    def delete(self, rows: Sequence[int]) -> 'ChunkTable':
+        """New table with these rows, and their duplicate references, marked deleted"""
+        rows = np.setdiff1d(np.asarray(rows, dtype=np.int64),
+                            np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted)))
+        if not len(rows):
+            return self
+        duplicates = dict(self.duplicates)
+        for row in rows.tolist():
+            duplicates.pop(row, None)
+        counts = self._pad(self.row_counts)
+        counts -= np.bincount(self.source_ids[rows], minlength=len(counts))
+        return ChunkTable(self.pool, duplicates=duplicates, deleted=self.deleted | set(rows.tolist()),
+                          row_counts=counts, store=self._store, **self._columns())
+
+    def take(self, rows: Sequence[int]) -> 'ChunkTable':
+        """New table with only the given rows, renumbered in that order
+
+        Strings move to a new pool holding just those the rows and their
+        duplicate references use; older snapshots keep the old pool.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {name: column[rows] for name, column in self._columns().items()}
+        pool = StringPool()
+        remap = np.full(len(self.pool.values), -1, dtype=np.int32)
+        path_ids = columns['path_ids']
+        for string_id in np.unique(np.concatenate([columns['source_ids'], path_ids[path_ids >= 0]])).tolist():
+            remap[string_id] = pool.intern(self.pool.values[string_id])
+        columns['source_ids'] = remap[columns['source_ids']]
+        columns['path_ids'] = np.where(path_ids >= 0, remap[np.maximum(path_ids, 0)], -1).astype(np.int32)
+        duplicates = {}
+        if self.duplicates:
+            for new_row, old_row in enumerate(rows.tolist()):
+                if old_row in self.duplicates:
+                    duplicates[new_row] = self._intern_refs(pool, self.duplicates[old_row])
+        deleted = frozenset(np.flatnonzero(~self.live_mask()[rows]).tolist())
+        return ChunkTable(pool, duplicates=duplicates, deleted=deleted, **columns)
+
+    def _pad(self, counts: np.ndarray) -> np.ndarray:
+        """Copy of per-string counts, extended to the current pool size"""
+        padded = np.zeros(len(self.pool.values), dtype=np.int64)
+        padded[:len(counts)] = counts
+        return padded
+
+    @property
+    def source_counts(self) -> np.ndarray:
+        """Live chunks per source string id, duplicate references included"""
+        if self._source_counts is None:
+            counts = self._pad(self.row_counts)
+            for refs in self.duplicates.values():
+                for ref in refs:
+                    counts[self.pool.ids[ref['source']]] += 1
+            self._source_counts = counts
+        return self._source_counts
+
+    def match_paths(self, paths: Set[str]) -> np.ndarray:
+        """Mask of live rows indexed from these paths; rows without a path match by file name"""
+        paths = {normalize_path(p) for p in paths}
+        path_ids = self.pool.lookup(paths)
+        name_ids = self.pool.lookup({Path(p).name for p in paths})
+        by_path = np.isin(self.path_ids, path_ids)
+        by_name = (self.path_ids < 0) & np.isin(self.source_ids, name_ids)
+        return (by_path | by_name) & self.live_mask()
+
+    def sources(self) -> List[str]:
+        """Sorted names of every source with at least one chunk or duplicate"""
+        if self._sources is None:
+            self._sources = sorted(self.pool.values[i] for i in np.flatnonzero(self.source_counts))
+        return self._sources
+
+    def paths(self) -> Set[str]:
+        """Every file path with a live chunk in the table"""
+        ids = np.unique(self.path_ids[self.live_mask()])
+        return {self.pool.values[i] for i in ids if i >= 0}
+
+    def unpathed_sources(self) -> Set[str]:
+        """Source names of live chunks indexed without a path (indexes saved before paths)"""
+        ids = np.unique(self.source_ids[(self.path_ids < 0) & self.live_mask()])
+        return {self.pool.values[i] for i in ids}
+
+    def parent_text_ids(self) -> Set[int]:
+        """text_ids still referenced by a live row or a duplicate reference"""
+        text_ids = self.text_ids[self.live_mask()]
+        referenced = set(np.unique(text_ids[text_ids >= 0]).tolist())
+        for refs in self.duplicates.values():
+            referenced.update(ref['parent']['text_id'] for ref in refs if 'parent' in ref)
+        return referenced
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (spare capacity included), string pool and row sets
+
+        Columns are counted from their buffers and strings once per pooled value,
+        so this costs O(unique sources and paths), not O(rows). Duplicate
+        references are walked; few rows carry them.
+        """
+        columns = sum(array.nbytes for array in self._store.arrays.values())
+        pool = (sys.getsizeof(self.pool.values) + sys.getsizeof(self.pool.ids)
+                + sum(map(sys.getsizeof, self.pool.values)))
+        refs = sys.getsizeof(self.duplicates) + sum(
+            sys.getsizeof(row_refs) + sum(sys.getsizeof(ref) for ref in row_refs)
+            for row_refs in self.duplicates.values())
+        return int(columns + pool + refs + sys.getsizeof(self.deleted) + self.row_counts.nbytes)
+
+    def to_json(self) -> Dict:
+        return {
+            'strings': self.pool.values,
+            'columns': {name: column.tolist() for name, column in self._columns().items()},
+            'duplicates': {str(row): refs for row, refs in self.duplicates.items()},
+            'deleted': sorted(self.deleted)
+        }
+
+    @classmethod
+    def from_json(cls, data) -> 'ChunkTable':
+        """Load to_json output, or the list of dicts older indexes saved"""
+        if isinstance(data, list):
+            return cls.from_dicts(data)
+        pool = StringPool(data['strings'])
+        columns = {name: np.array(data['columns'][name], dtype=dtype) for name, dtype in _DTYPES.items()}
+        duplicates = {int(row): cls._intern_refs(pool, refs) for row, refs in data['duplicates'].items()}
+        deleted = frozenset(data.get('deleted', ()))
+        return cls(pool, duplicates=duplicates, deleted=deleted, **columns)
+
+    def with_normalized_paths(self) -> 'ChunkTable':
+        """Same rows with every path in normalize_path form
+
+        Indexes saved before paths were normalized hold them as they were given,
+        often relative to the working directory.
+        """
+        used = np.unique(self.path_ids[self.path_ids >= 0])
+        remap = np.arange(len(self.pool.values), dtype=np.int32)
+        for path_id in used:
+            remap[path_id] = self.pool.intern(normalize_path(self.pool.values[path_id]))
+        refs_changed = any('path' in ref and normalize_path(ref['path']) != ref['path']
+                           for refs in self.duplicates.values() for ref in refs)
+        if np.array_equal(remap[used], used) and not refs_changed:
+            return self
+
+        columns = self._columns()
+        columns['path_ids'] = np.where(self.path_ids >= 0, remap[np.maximum(self.path_ids, 0)], -1)
+        columns['path_ids'] = columns['path_ids'].astype(np.int32)
+        duplicates = {row: self._intern_refs(self.pool, [
+                          dict(ref, path=normalize_path(ref['path'])) if 'path' in ref else ref
+                          for ref in refs])
+                      for row, refs in self.duplicates.items()}
+        return ChunkTable(self.pool, duplicates=duplicates, deleted=self.deleted,
+                          row_counts=self.row_counts, **columns)
@@ -0,0 +1,149 @@
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+from loguru import logger
+
+# Minimum cosine similarity between ONNX and torch embeddings of the same text.
+# Vectors within these bounds can be searched against indexes built with torch.
+FP32_TOLERANCE = 0.9999
+INT8_TOLERANCE = 0.99
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+CONFIG_FILE = "embedding_config.json"
+
+
+def export_onnx(model_name: str, output_dir: str, quantize: bool = False) -> Path:
+    """Export a SentenceTransformer's encoder to ONNX, optionally with an int8 copy"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model_path = output_dir / MODEL_FILE
+
+    logger.info(f"Exporting {model_name} to ONNX: {output_dir}")
+    st_model = SentenceTransformer(model_name, device='cpu')
+    encoder = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    dummy = dict(tokenizer(["export sample"], return_tensors='pt', padding=True))
+    input_names = list(dummy.keys())
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            (dummy,),
+            str(model_path),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(str(output_dir))
+
+    # Record the pooling/normalization stages that follow the encoder
+    pooling = st_model[1]
+    module_names = [type(module).__name__ for module in st_model]
+    config = {
+        'model_name': model_name,
+        'max_seq_length': st_model.max_seq_length,
+        'embedding_dim': st_model.get_sentence_embedding_dimension(),
+        'pooling': 'cls' if getattr(pooling, 'pooling_mode_cls_token', False) else 'mean',
+        'normalize': 'Normalize' in module_names
+    }
+    with open(output_dir / CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+    if quantize:
+        quantize_onnx(output_dir)
+
+    return model_path
+
+
+def quantize_onnx(model_dir: str) -> Path:
+    """Apply dynamic int8 weight quantization to an exported model"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    model_dir = Path(model_dir)
+    output_path = model_dir / QUANTIZED_MODEL_FILE
+    quantize_dynamic(str(model_dir / MODEL_FILE), str(output_path), weight_type=QuantType.QInt8)
+    logger.info(f"Quantized model written to {output_path}")
+    return output_path
+
+
+class OnnxEmbeddingModel:
+    """onnxruntime drop-in for the SentenceTransformer methods EmbeddingManager uses"""
+
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        with open(model_dir / CONFIG_FILE, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+        self.model_path = model_dir / model_file
+        self.session = ort.InferenceSession(
+            str(self.model_path), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.max_seq_length = self.config['max_seq_length']
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['embedding_dim']
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors='np'
+        )
+        feeds = {name: encoded[name].astype('int64') for name in self.input_names}
+        hidden = self.session.run(['last_hidden_state'], feeds)[0]
+
+        if self.config['pooling'] == 'cls':
+            pooled = hidden[:, 0]
+        else:
+            mask = encoded['attention_mask'][..., None].astype('float32')
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.config['normalize']:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True) -> np.ndarray:
+        """Encode texts, batching by length to minimise padding"""
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype='float32')
+
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype='float32')
+        for i in range(0, len(texts), batch_size):
+            batch_idx = order[i:i + batch_size]
+            embeddings[batch_idx] = self._encode_batch([texts[j] for j in batch_idx])
+        return embeddings
+
+
+def load_onnx_model(model_name: str, onnx_dir: str = "models/onnx", quantize: bool = False,
+                    num_threads: Optional[int] = None) -> OnnxEmbeddingModel:
+    """Load the ONNX model for model_name, exporting it on first use"""
+    model_dir = Path(onnx_dir) / model_name.replace('/', '__')
+    if not (model_dir / MODEL_FILE).exists():
+        export_onnx(model_name, str(model_dir), quantize=quantize)
+    elif quantize and not (model_dir / QUANTIZED_MODEL_FILE).exists():
+        quantize_onnx(str(model_dir))
+    return OnnxEmbeddingModel(str(model_dir), quantized=quantize, num_threads=num_threads)
@@ -1,201 +1,827 @@
 import numpy as np
 import os
+import re
 import faiss
 import requests
 import json
-from typing import List, Dict, Tuple
+import threading
+import copy
+import time
+import itertools
+from collections import defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Tuple
 from loguru import logger
 
 from .chunking import TextChunker
+from .conversation import ConversationMemory
+from .dedup import MinHashDeduplicator
 from .embeddings import EmbeddingManager
+from .memory import deep_sizeof, index_bytes, model_bytes, process_rss, strings_bytes
+from .metadata import ChunkTable, normalize_path
+from .rwlock import ReadWriteLock
+from .single_flight import SingleFlight
+from .llm_router import LLMEndpoint, LLMRouter, LLMUnavailableError
+
+SEARCH_METRICS = ('l2', 'cosine')
+NO_CONTEXT_RESPONSE = "I don't have any relevant information to answer that."
+# Rebuild the index once this fraction of its rows are deleted
+COMPACT_FRACTION = 0.25
+
+# Sentence boundaries for calibration probes
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+class ChunkView(Sequence):
+    """Read-only view of the first n chunks of a shared, append-only list"""
+    
+    __slots__ = ('items', 'n')
+    
+    def __init__(self, items: List[str], n: int):
+        self.items = items
+        self.n = n
+    
+    def __len__(self) -> int:
+        return self.n
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.items[:self.n][i]
+        return self.items[range(self.n)[i]]
+
+class KnowledgeBase:
+    """Snapshot of the index and the chunks/metadata its ids point to
+    
+    The FAISS index, chunk list and texts are append-only stores shared with
+    later snapshots, so publishing a batch costs O(batch). A snapshot covers the
+    first len(metadata) rows of them, minus rows its metadata marks deleted;
+    compaction builds fresh stores. In hierarchical mode, texts maps text_id to
+    a document's full text, which parent spans in chunk metadata slice into.
+    """
+    
+    def __init__(self, index: faiss.Index, chunks: List[str], metadata: ChunkTable, version: int = 0,
+                 texts: Optional[Dict[int, str]] = None):
+        self.index = index
+        self.chunks = ChunkView(chunks, len(metadata))
+        self.metadata = metadata
+        self.version = version
+        self.texts = texts if texts is not None else {}
+        self._search_params = None
+    
+    def search_params(self) -> Optional[faiss.SearchParameters]:
+        """Restrict a search to this snapshot's live rows; None when every row qualifies
+        
+        Call with the index read lock held.
+        """
+        rows = len(self.metadata)
+        if self.index.ntotal == rows and not self.metadata.deleted:
+            return None
+        if self._search_params is None:
+            selector = faiss.IDSelectorRange(0, rows)
+            # SWIG selectors do not keep their parts alive; hold them here
+            parts = [selector]
+            if self.metadata.deleted:
+                deleted = faiss.IDSelectorBatch(np.fromiter(sorted(self.metadata.deleted), dtype='int64'))
+                live = faiss.IDSelectorNot(deleted)
+                selector = faiss.IDSelectorAnd(selector, live)
+                parts += [deleted, live, selector]
+            self._selector_parts = parts
+            self._search_params = faiss.SearchParameters(sel=selector)
+        return self._search_params
 
 class RAGChatbot:
     def __init__(self, nvidia_api_key: str, nvidia_api_url: str, 
                  model_name: str = "openai/gpt-oss-20b",
-                 chunk_size: int = 500, chunk_overlap: int = 50):
-        """Initialize RAG Chatbot"""
+                 chunk_size: int = 500, chunk_overlap: int = 50,
+                 embedding_workers: int = 1, embedding_backend: str = 'torch',
+                 embedding_quantize: bool = False, metric: str = 'l2',
+                 min_similarity: Optional[float] = None, dedup: bool = False,
+                 dedup_threshold: float = 0.8, llm_endpoints: Optional[List[LLMEndpoint]] = None,
+                 hedge_requests: bool = False, embedder: Optional[EmbeddingManager] = None,
+                 parent_chunk_size: Optional[int] = None, hedge_percentile: float = 95.0):
+        """Initialize RAG Chatbot; pass embedder to share an already loaded model
+        
+        With parent_chunk_size set, chunk_size/chunk_overlap size the small child
+        chunks that are searched, and each hit is widened to its parent section
+        (up to parent_chunk_size tokens) when the prompt is built.
+        """
         self.nvidia_api_key = nvidia_api_key
         self.nvidia_api_url = nvidia_api_url
         self.model_name = model_name
         
+        # Extra endpoints join the configured one; routing picks the fastest healthy one
+        endpoints = [LLMEndpoint(nvidia_api_url, model_name, nvidia_api_key)] + list(llm_endpoints or [])
+        self.router = LLMRouter(endpoints, hedge=hedge_requests, hedge_percentile=hedge_percentile)
+        self.single_flight = SingleFlight()
+        
         # Initialize components
         logger.info("Initializing RAG components...")
         self.chunker = TextChunker(chunk_size, chunk_overlap)
-        self.embedder = EmbeddingManager()
+        self.parent_chunk_size = parent_chunk_size
+        self._text_ids = itertools.count()
+        self.embedder = embedder or EmbeddingManager(
+            num_workers=embedding_workers,
+            backend=embedding_backend,
+            quantize=embedding_quantize
+        )
         
         # Initialize FAISS index
-        self.index = faiss.IndexFlatL2(self.embedder.embedding_dim)
+        if metric not in SEARCH_METRICS:
+            raise ValueError(f"Unknown search metric: {metric}")
+        self.metric = metric
+        self.min_similarity = min_similarity
+        # An unset threshold is derived from the corpus, and re-derived as it changes
+        self.auto_threshold = min_similarity is None
+        
+        # Near-duplicate chunks are collapsed at ingest when enabled
+        self.dedup_threshold = dedup_threshold
+        self.deduplicator = MinHashDeduplicator(dedup_threshold) if dedup else None
+        self._dedup_synced = 0
+        self.dedup_stats = {'chunks_seen': 0, 'duplicates': 0, 'seconds': 0.0}
         
-        # Storage
-        self.chunks = []
-        self.metadata = []
+        # Readers take one snapshot per call; writers publish a new one atomically.
+        # Appending to the shared index reallocates it, so searches exclude appends.
+        self._kb = KnowledgeBase(self._new_index(), [], ChunkTable.empty())
+        self._write_lock = threading.Lock()
+        self._index_lock = ReadWriteLock()
+        # The watcher, ingest worker and HTTP /ingest may all save the same files
+        self._save_lock = threading.Lock()
+        # (index version, component bytes) of the last memory_usage() measurement
+        self._memory_usage = None
         
         logger.info("RAG Chatbot initialized successfully!")
     
-    def add_documents(self, documents: List[Dict[str, str]]):
-        """Add documents to the knowledge base"""
+    @property
+    def index(self) -> faiss.Index:
+        return self._kb.index
+    
+    @property
+    def chunks(self) -> List[str]:
+        return self._kb.chunks
+    
+    @property
+    def metadata(self) -> ChunkTable:
+        """Per-chunk metadata; row i is a dict describing chunk i"""
+        return self._kb.metadata
+    
+    @property
+    def chunk_count(self) -> int:
+        """Indexed chunks; len(chunks) also counts deleted rows awaiting compaction"""
+        return self._kb.metadata.live_count
+    
+    @property
+    def index_version(self) -> int:
+        """Incremented each time new chunks are published"""
+        return self._kb.version
+    
+    def _new_index(self) -> faiss.Index:
+        """Create an empty index for the configured metric"""
+        if self.metric == 'cosine':
+            return faiss.IndexFlatIP(self.embedder.embedding_dim)
+        return faiss.IndexFlatL2(self.embedder.embedding_dim)
+    
+    def _prepare_vectors(self, embeddings: np.ndarray) -> np.ndarray:
+        """Normalize vectors in place for inner-product search"""
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        if self.metric == 'cosine':
+            faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def add_documents(self, documents: List[Dict[str, str]], replace: bool = False,
+                      remove: Sequence[str] = ()) -> int:
+        """Add documents to the knowledge base; returns the number of chunks added
+        
+        With replace=True, chunks previously indexed from the same paths are dropped
+        in the same snapshot, so searches never see a file missing or doubled.
+        Chunks from the paths in remove (deleted files) are dropped in it too.
+        """
         logger.info(f"Processing {len(documents)} documents...")
         
         all_chunks = []
         all_metadata = []
+        all_texts = {}
         
         for doc_idx, doc in enumerate(documents):
             text = doc['text']
             source = doc.get('source', f'document_{doc_idx}')
+            path = normalize_path(doc['path']) if 'path' in doc else None
             
             # Chunk the document
-            chunks = self.chunker.chunk_by_tokens(text)
+            if self.parent_chunk_size:
+                chunks, parents = self._chunk_hierarchical(doc)
+                if chunks:
+                    text_id = next(self._text_ids)
+                    all_texts[text_id] = text
+            else:
+                chunks, parents = self.chunker.chunk_by_tokens(text), None
             logger.info(f"  {source}: {len(chunks)} chunks")
             
             # Store chunks and metadata
             for chunk_idx, chunk in enumerate(chunks):
                 all_chunks.append(chunk)
-                all_metadata.append({
+                meta = {
                     'source': source,
                     'chunk_id': chunk_idx,
                     'doc_id': doc_idx
-                })
+                }
+                if path is not None:
+                    meta['path'] = path
+                if parents is not None:
+                    start, end = parents[chunk_idx]
+                    meta['parent'] = {'text_id': text_id, 'start': start, 'end': end}
+                all_metadata.append(meta)
+        
+        if not all_chunks and not replace and not remove:
+            logger.warning("No text to index")
+            return 0
+        
+        # Writers are serialized; searches keep using the current snapshot throughout
+        with self._write_lock:
+            current = self._kb
+            dropped = list(remove)
+            if replace:
+                dropped += [doc['path'] for doc in documents if 'path' in doc]
+            if dropped:
+                current, removed = self._drop_paths(current, dropped)
+                if removed:
+                    logger.info(f"Dropped {removed} chunks from {len(dropped)} replaced or removed file(s)")
+            metadata = current.metadata
+            
+            if self.deduplicator is not None and all_chunks:
+                all_chunks, all_metadata, metadata = self._deduplicate(current, all_chunks, all_metadata)
+            
+            if all_chunks:
+                # Generate embeddings in batch
+                logger.info("Generating embeddings...")
+                try:
+                    embeddings = self._prepare_vectors(self.embedder.embed_texts(all_chunks))
+                except Exception:
+                    # Signatures for the unpublished chunks must not linger
+                    if self.deduplicator is not None:
+                        self.deduplicator = MinHashDeduplicator(self.dedup_threshold)
+                        self._dedup_synced = 0
+                    raise
+                current = self._append(current, metadata, all_chunks, all_metadata, embeddings, all_texts)
+            else:
+                # Every chunk collapsed into existing ones; their references may need the texts
+                current.texts.update(all_texts)
+                current = KnowledgeBase(current.index, current.chunks.items, metadata,
+                                        current.version, current.texts)
+            
+            self._kb = KnowledgeBase(current.index, current.chunks.items, current.metadata,
+                                     current.version + 1, current.texts)
+        
+        logger.info(f"Total chunks in knowledge base: {self.chunk_count}")
+        return len(all_chunks)
+    
+    def _append(self, kb: KnowledgeBase, metadata: ChunkTable, chunks: List[str],
+                chunk_metadata: List[Dict], vectors: np.ndarray,
+                texts: Dict[int, str]) -> KnowledgeBase:
+        """Snapshot with rows added to kb's shared stores; same version, not yet published
+        
+        metadata is kb.metadata with any pending duplicate-reference changes.
+        """
+        rows = len(metadata)
+        with self._index_lock.write():
+            index = kb.index
+            if index.ntotal > rows:
+                # Left behind by an append that failed before it was published
+                index.remove_ids(faiss.IDSelectorRange(rows, index.ntotal))
+            index.add(vectors)
+        store = kb.chunks.items
+        del store[rows:]
+        store.extend(chunks)
+        kb.texts.update(texts)
+        return KnowledgeBase(index, store, metadata.append(chunk_metadata), kb.version, kb.texts)
+    
+    def _chunk_hierarchical(self, doc: Dict) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """Child chunks of each parent span, with the span each child belongs to"""
+        text = doc['text']
+        chunks = []
+        parents = []
+        for start, end in self.chunker.parent_spans(text, doc.get('sections'), self.parent_chunk_size):
+            for chunk in self.chunker.chunk_by_tokens(text[start:end]):
+                if chunk.strip():
+                    chunks.append(chunk)
+                    parents.append((start, end))
+        return chunks, parents
+    
+    def remove_documents(self, paths: List[str]) -> int:
+        """Drop every chunk indexed from the given file paths; returns chunks removed"""
+        with self._write_lock:
+            current = self._kb
+            kb, removed = self._drop_paths(current, paths)
+            if kb is not current:
+                self._kb = KnowledgeBase(kb.index, kb.chunks.items, kb.metadata, current.version + 1, kb.texts)
+        
+        if removed:
+            logger.info(f"Removed {removed} chunks from {len(paths)} file(s)")
+        return removed
+    
+    def _drop_paths(self, kb: KnowledgeBase, paths: List[str]) -> Tuple[KnowledgeBase, int]:
+        """Snapshot without chunks (or duplicate references) from paths; same version
+        
+        Rows are marked deleted rather than removed, so nothing is copied until
+        deleted rows pass COMPACT_FRACTION of the index and it is rebuilt.
+        """
+        paths = {normalize_path(p) for p in paths}
+        names = {Path(p).name for p in paths}
+        table = kb.metadata
+        if not paths or not table:
+            return kb, 0
+        
+        def matches(ref: Dict) -> bool:
+            # Indexes saved before paths were recorded only know the file name
+            return ref['path'] in paths if 'path' in ref else ref['source'] in names
+        
+        dropped = table.match_paths(paths)
+        # Few rows carry duplicate references; check those one by one
+        updates = {}
+        promoted = {}
+        for row, refs in table.duplicates.items():
+            survivors = [ref for ref in refs if not matches(ref)]
+            if dropped[row]:
+                if survivors:
+                    # Another file still has this text: its reference becomes the chunk
+                    promoted[row] = dict(survivors[0], duplicates=survivors[1:])
+            elif len(survivors) < len(refs):
+                updates[row] = survivors
+        
+        drop = np.flatnonzero(dropped)
+        if not len(drop) and not updates:
+            return kb, 0
+        metadata = table.with_duplicates(updates).delete(drop)
+        if self.deduplicator is not None:
+            self.deduplicator.discard(drop.tolist())
+        kb = KnowledgeBase(kb.index, kb.chunks.items, metadata, kb.version, kb.texts)
+        
+        if promoted:
+            # Re-added as new rows with the same text and vector
+            rows = list(promoted)
+            signed = self._dedup_synced == len(metadata)
+            kb = self._append(kb, metadata, [kb.chunks[row] for row in rows], list(promoted.values()),
+                              kb.index.reconstruct_batch(np.array(rows, dtype='int64')), {})
+            if self.deduplicator is not None and signed:
+                for row in range(len(metadata), len(kb.metadata)):
+                    self.deduplicator.add(row, self.deduplicator.signature(kb.chunks[row]))
+                self._dedup_synced = len(kb.metadata)
+        
+        if len(kb.metadata.deleted) > COMPACT_FRACTION * len(kb.metadata):
+            kb = self._compact(kb)
+        return kb, len(drop) - len(promoted)
+    
+    def _compact(self, kb: KnowledgeBase, block: int = 65536) -> KnowledgeBase:
+        """Snapshot with deleted rows gone, on fresh stores; same version
+        
+        Holds the live vectors twice while it runs, so it is kept rare.
+        """
+        table = kb.metadata
+        keep = np.flatnonzero(table.live_mask())
+        index = self._new_index()
+        for start in range(0, len(keep), block):
+            index.add(kb.index.reconstruct_batch(keep[start:start + block]))
+        metadata = table.take(keep)
+        
+        # Positions shift; renumber dedup signatures to match
+        if self.deduplicator is not None:
+            if self._dedup_synced == len(table):
+                self.deduplicator.retain(keep.tolist())
+                self._dedup_synced = len(keep)
+            else:
+                self.deduplicator = MinHashDeduplicator(self.dedup_threshold)
+                self._dedup_synced = 0
+        
+        # Keep full texts only while some chunk (or duplicate reference) still points at them
+        referenced = metadata.parent_text_ids()
+        texts = {text_id: text for text_id, text in kb.texts.items() if text_id in referenced}
+        
+        logger.info(f"Compacted index: {len(table)} -> {len(keep)} rows")
+        return KnowledgeBase(index, [kb.chunks.items[i] for i in keep], metadata, kb.version, texts)
+    
+    def _deduplicate(self, current: KnowledgeBase, new_chunks: List[str],
+                     new_metadata: List[Dict]) -> Tuple[List[str], List[Dict], ChunkTable]:
+        """Collapse near-duplicate chunks into one indexed chunk listing every source
+        
+        Returns the chunks to index with their metadata, and the existing metadata
+        table with duplicate references added.
+        """
+        start = time.perf_counter()
+        dedup = self.deduplicator
         
-        # Generate embeddings in batch
-        logger.info("Generating embeddings...")
-        embeddings = self.embedder.embed_texts(all_chunks)
+        # Existing chunks not yet signed, e.g. after load_index
+        deleted = current.metadata.deleted
+        for chunk_idx in range(self._dedup_synced, len(current.chunks)):
+            if chunk_idx not in deleted:
+                dedup.add(chunk_idx, dedup.signature(current.chunks[chunk_idx]))
+        self._dedup_synced = len(current.chunks)
         
-        # Add to FAISS index
-        self.index.add(embeddings)
+        kept_chunks = []
+        kept_metadata = []
+        duplicates = defaultdict(list)
+        for chunk, meta in zip(new_chunks, new_metadata):
+            signature = dedup.signature(chunk)
+            match = dedup.find(signature)
+            if match is None:
+                dedup.add(len(current.chunks) + len(kept_chunks), signature)
+                kept_chunks.append(chunk)
+                kept_metadata.append(meta)
+            else:
+                duplicates[match].append(meta)
         
-        # Store
-        self.chunks.extend(all_chunks)
-        self.metadata.extend(all_metadata)
+        updates = {}
+        for idx, refs in duplicates.items():
+            refs = [{k: ref[k] for k in ('source', 'path', 'chunk_id', 'doc_id', 'parent') if k in ref}
+                    for ref in refs]
+            if idx < len(current.chunks):
+                updates[idx] = current.metadata.duplicates.get(idx, []) + refs
+            else:
+                meta = kept_metadata[idx - len(current.chunks)]
+                meta.setdefault('duplicates', []).extend(refs)
+        self._dedup_synced += len(kept_chunks)
         
-        logger.info(f"Total chunks in knowledge base: {len(self.chunks)}")
+        elapsed = time.perf_counter() - start
+        collapsed = len(new_chunks) - len(kept_chunks)
+        self.dedup_stats['chunks_seen'] += len(new_chunks)
+        self.dedup_stats['duplicates'] += collapsed
+        self.dedup_stats['seconds'] += elapsed
+        logger.info(f"Dedup: collapsed {collapsed}/{len(new_chunks)} chunks "
+                    f"({collapsed / len(new_chunks):.1%}) in {elapsed:.2f}s")
+        
+        return kept_chunks, kept_metadata, current.metadata.with_duplicates(updates)
     
     def retrieve(self, query: str, top_k: int = 3) -> List[Tuple[str, Dict, float]]:
         """Retrieve most relevant chunks"""
-        if len(self.chunks) == 0:
+        kb = self._kb
+        live = kb.metadata.live_count
+        if live == 0:
             logger.warning("No documents in knowledge base")
             return []
         
         # Embed query
-        query_embedding = self.embedder.embed_query(query)
+        query_embedding = self._prepare_vectors(self.embedder.embed_query(query))
         
-        # Search
-        distances, indices = self.index.search(query_embedding, min(top_k, len(self.chunks)))
+        # Search this snapshot's rows only; later appends may already be in the index
+        with self._index_lock.read():
+            distances, indices = kb.index.search(query_embedding, min(top_k, live),
+                                                 params=kb.search_params())
         
         # Collect results
         results = []
         for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.chunks):
+            if 0 <= idx < len(kb.chunks):
                 results.append((
-                    self.chunks[idx],
-                    self.metadata[idx],
+                    kb.chunks[idx],
+                    kb.metadata[idx],
                     float(distance)
                 ))
         
+        # Scores are cosine similarities in cosine mode; drop chunks below the bar
+        if self.metric == 'cosine' and self.min_similarity is not None:
+            kept = [r for r in results if r[2] >= self.min_similarity]
+            if len(kept) < len(results):
+                logger.debug(f"Trimmed {len(results) - len(kept)} chunks below similarity {self.min_similarity:.3f}")
+            results = kept
+        
         return results
     
-    def generate_response(self, query: str, context: str) -> str:
-        """Generate response using NVIDIA API"""
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by each component of the current snapshot
+        
+        Component sizes are computed once per index version and shared by
+        concurrent callers; only process_rss, and embedding_pool_rss while the
+        embedding worker pool runs, are read on every call. Chunks,
+        texts and dedup signatures are still O(corpus) to measure, so the first
+        call after each change pays for it.
+        """
+        kb = self._kb
+        cached = self._memory_usage
+        if cached is None or cached[0] != kb.version:
+            usage = self.single_flight.do(('memory_usage', kb.version), lambda: self._measure_memory(kb))
+            cached = self._memory_usage = (kb.version, usage)
+        usage = dict(cached[1])
+        rss = process_rss()
+        if rss is not None:
+            usage['process_rss'] = rss
+        # Embedding workers are separate processes, each with a model copy
+        pool = getattr(self.embedder, 'pool', None)
+        if pool is not None:
+            usage['embedding_pool_rss'] = sum(process_rss(pid) or 0 for pid in pool.worker_pids)
+        return usage
+    
+    def _measure_memory(self, kb: KnowledgeBase) -> Dict[str, int]:
+        usage = {
+            'index': index_bytes(kb.index),
+            'chunks': strings_bytes(kb.chunks.items),
+            'metadata': kb.metadata.nbytes,
+            'texts': deep_sizeof(kb.texts),
+            'dedup': deep_sizeof(self.deduplicator) if self.deduplicator is not None else 0,
+            'model': model_bytes(self.embedder.model)
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+    
+    def calibrate_threshold(self, percentile: float = 95.0, sample_size: int = 500,
+                            seed: int = 0) -> float:
+        """Set min_similarity from how query-like text scores against unrelated chunks
+        
+        Probes are single sentences sampled from indexed chunks and embedded like
+        queries; each is scored against a random chunk from another source. The
+        chosen percentile of that background distribution is the score a chunk
+        must beat to count as more related to the query than chance.
+        """
+        if self.metric != 'cosine':
+            raise ValueError("Threshold calibration requires metric='cosine'")
+        kb = self._kb
+        table = kb.metadata
+        if table.live_count < 2:
+            raise ValueError("Need at least 2 indexed chunks to calibrate")
+        
+        rng = np.random.default_rng(seed)
+        live = np.flatnonzero(table.live_mask())
+        probe_rows = rng.choice(live, min(sample_size, len(live)), replace=False)
+        other_rows = rng.choice(live, len(probe_rows))
+        unrelated = table.source_ids[probe_rows] != table.source_ids[other_rows]
+        probe_rows, other_rows = probe_rows[unrelated], other_rows[unrelated]
+        if not len(probe_rows):
+            raise ValueError("Need chunks from at least 2 sources to calibrate")
+        
+        probes = [self._probe_sentence(kb.chunks[row], rng) for row in probe_rows]
+        queries = self._prepare_vectors(self.embedder.embed_texts(probes))
+        # Only the sampled rows are read back from the index
+        with self._index_lock.read():
+            vectors = kb.index.reconstruct_batch(other_rows.astype('int64'))
+        similarities = np.einsum('ij,ij->i', queries, vectors)
+        
+        self.min_similarity = float(np.percentile(similarities, percentile))
+        logger.info(f"Calibrated similarity threshold: {self.min_similarity:.3f} "
+                    f"(p{percentile:g} of {len(similarities)} sentence/chunk pairs)")
+        return self.min_similarity
+    
+    def auto_calibrate(self) -> Optional[float]:
+        """Re-derive min_similarity from the current corpus unless it was configured
+        
+        With fewer than two sources there is no unrelated text to measure against,
+        so the threshold is left unset.
+        """
+        if self.metric != 'cosine' or not self.auto_threshold:
+            return self.min_similarity
+        if np.count_nonzero(self.metadata.row_counts) < 2:
+            self.min_similarity = None
+            return None
+        try:
+            return self.calibrate_threshold()
+        except ValueError as e:
+            logger.warning(f"Similarity threshold not calibrated: {e}")
+            return self.min_similarity
+    
+    @staticmethod
+    def _probe_sentence(chunk: str, rng: np.random.Generator, max_words: int = 30) -> str:
+        """A random sentence of chunk, short enough to read like a question"""
+        sentences = [s for s in _SENTENCE_END.split(chunk) if len(s.split()) >= 4]
+        words = (sentences[rng.integers(len(sentences))] if sentences else chunk).split()
+        return ' '.join(words[:max_words])
+    
+    def _build_payload(self, query: str, context: str, history: str = "") -> Dict:
+        """Build the chat completions payload; the router fills in model and stream"""
+        conversation = f"Conversation so far:\n{history}\n\n" if history else ""
         prompt = f"""You are a helpful assistant. Answer the user's question based on the provided context.
 
-Context:
+{conversation}Context:
 {context}
 
 Question: {query}
 
 Answer the question based on the context above. If the context doesn't contain relevant information, say so."""
 
-        headers = {
-            "Authorization": f"Bearer {self.nvidia_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model_name,
+        return {
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.7,
             "max_tokens": 1024
         }
+    
+    def generate_response(self, query: str, context: str, history: str = "") -> str:
+        """Generate response using NVIDIA API"""
+        payload = self._build_payload(query, context, history)
+        prompt = payload['messages'][0]['content']
         
         try:
-            response = requests.post(
-                self.nvidia_api_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result['choices'][0]['message']['content']
+            # Identical prompts in flight at the same moment share one upstream call
+            return self.single_flight.do(('generate', prompt), lambda: self.router.complete(payload))
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, LLMUnavailableError) as e:
             logger.error(f"NVIDIA API error: {e}")
             return f"Error calling NVIDIA API: {str(e)}"
     
-    def chat(self, query: str, top_k: int = 3, show_sources: bool = True) -> Dict:
-        """Main chat function"""
-        # Retrieve
-        retrieved = self.retrieve(query, top_k)
+    def generate_response_stream(self, query: str, context: str, history: str = "") -> Iterator[str]:
+        """Generate response using NVIDIA API, yielding content deltas as they arrive"""
+        payload = self._build_payload(query, context, history)
+        prompt = payload['messages'][0]['content']
+        
+        try:
+            yield from self.single_flight.stream(('generate_stream', prompt), lambda: self.router.stream(payload))
+                        
+        except (requests.exceptions.RequestException, LLMUnavailableError) as e:
+            logger.error(f"NVIDIA API error: {e}")
+            yield f"Error calling NVIDIA API: {str(e)}"
+    
+    def build_context(self, retrieved: List[Tuple[str, Dict, float]]) -> str:
+        """Prompt context: each hit widened to its parent span, each parent used once"""
+        # text_ids are never reused, so a newer snapshot's texts still match these hits
+        texts = self._kb.texts
+        parts = []
+        seen = set()
+        for chunk, meta, _ in retrieved:
+            parent = meta.get('parent')
+            if parent is None or parent['text_id'] not in texts:
+                parts.append(chunk)
+                continue
+            key = (parent['text_id'], parent['start'])
+            if key not in seen:
+                seen.add(key)
+                parts.append(texts[parent['text_id']][parent['start']:parent['end']])
+        return "\n\n".join(parts)
+    
+    def _format_sources(self, retrieved: List[Tuple[str, Dict, float]]) -> List[Dict]:
+        """Summarize retrieved chunks for display"""
+        sources = []
+        for chunk, meta, distance in retrieved:
+            sources.append({
+                'source': meta['source'],
+                'chunk_id': meta['chunk_id'],
+                'relevance_score': float(distance),
+                'preview': chunk[:200] + '...' if len(chunk) > 200 else chunk
+            })
+            if meta.get('duplicates'):
+                sources[-1]['also_in'] = sorted({ref['source'] for ref in meta['duplicates']})
+        return sources
+    
+    def _flight_key(self, kind: str, query: str, top_k: int, show_sources: bool) -> Tuple:
+        """Requests with equal keys may share one execution while it is in flight"""
+        return (kind, ' '.join(query.lower().split()), top_k, show_sources, self.index_version)
+    
+    def _retrieve_shared(self, query: str, top_k: int) -> List[Tuple[str, Dict, float]]:
+        """retrieve(), shared by concurrent callers with the same query, top_k and index
+
+        Conversations can't share their answers, but a rewritten follow-up often
+        matches another session's question, so the search itself is coalesced.
+        """
+        key = ('retrieve', ' '.join(query.lower().split()), top_k, self.index_version)
+        return copy.deepcopy(self.single_flight.do(key, lambda: self.retrieve(query, top_k)))
+    
+    def chat(self, query: str, top_k: int = 3, show_sources: bool = True,
+             memory: Optional[ConversationMemory] = None) -> Dict:
+        """Main chat function; pass a ConversationMemory for multi-turn chat"""
+        if memory is not None:
+            return self._chat(query, top_k, show_sources, memory)
+        
+        # Concurrent identical questions share one retrieval + LLM call
+        result = self.single_flight.do(
+            self._flight_key('chat', query, top_k, show_sources),
+            lambda: self._chat(query, top_k, show_sources)
+        )
+        return copy.deepcopy(result)
+    
+    def _chat(self, query: str, top_k: int, show_sources: bool,
+              memory: Optional[ConversationMemory] = None) -> Dict:
+        # Retrieve, resolving follow-ups against earlier turns
+        retrieval_query = memory.rewrite_query(query) if memory else query
+        retrieved = self._retrieve_shared(retrieval_query, top_k)
         
         if not retrieved:
+            if memory:
+                memory.add_turn(query, NO_CONTEXT_RESPONSE)
             return {
-                'response': "I don't have any relevant information to answer that.",
+                'response': NO_CONTEXT_RESPONSE,
                 'sources': []
             }
         
         # Build context
-        context = "\n\n".join([chunk for chunk, _, _ in retrieved])
+        context = self.build_context(retrieved)
         
         # Generate
-        response = self.generate_response(query, context)
+        response = self.generate_response(query, context, memory.render() if memory else "")
+        if memory:
+            memory.add_turn(query, response)
         
         result = {'response': response}
         
         if show_sources:
-            sources = []
-            for chunk, meta, distance in retrieved:
-                sources.append({
-                    'source': meta['source'],
-                    'chunk_id': meta['chunk_id'],
-                    'relevance_score': float(distance),
-                    'preview': chunk[:200] + '...' if len(chunk) > 200 else chunk
-                })
-            result['sources'] = sources
+            result['sources'] = self._format_sources(retrieved)
         
         return result
     
-    def save_index(self, filepath: str):
-        if len(self.chunks) == 0:
-            logger.warning("No chunks to save. Skipping index save.")
-            return
+    def chat_stream(self, query: str, top_k: int = 3, show_sources: bool = True,
+                    memory: Optional[ConversationMemory] = None) -> Iterator[Dict]:
+        """Streaming chat: yields a sources event, then token events, then done"""
+        if memory is not None:
+            return self._chat_stream(query, top_k, show_sources, memory)
         
-        try:
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else ".", exist_ok=True)
-            
-            faiss.write_index(self.index, f"{filepath}.index")
-            
-            with open(f"{filepath}.meta", 'w', encoding='utf-8') as f:
-                json.dump({
-                    'chunks': self.chunks,
-                    'metadata': self.metadata
-                }, f)
+        # Concurrent identical questions subscribe to one stream of events
+        return self.single_flight.stream(
+            self._flight_key('chat_stream', query, top_k, show_sources),
+            lambda: self._chat_stream(query, top_k, show_sources)
+        )
+    
+    def _chat_stream(self, query: str, top_k: int, show_sources: bool,
+                     memory: Optional[ConversationMemory] = None) -> Iterator[Dict]:
+        retrieval_query = memory.rewrite_query(query) if memory else query
+        retrieved = self._retrieve_shared(retrieval_query, top_k)
+        
+        if show_sources:
+            yield {'type': 'sources', 'sources': self._format_sources(retrieved)}
+        
+        tokens = []
+        if not retrieved:
+            tokens.append(NO_CONTEXT_RESPONSE)
+            yield {'type': 'token', 'content': NO_CONTEXT_RESPONSE}
+        else:
+            context = self.build_context(retrieved)
+            history = memory.render() if memory else ""
+            for token in self.generate_response_stream(query, context, history):
+                tokens.append(token)
+                yield {'type': 'token', 'content': token}
+        
+        if memory:
+            memory.add_turn(query, ''.join(tokens))
+        yield {'type': 'done'}
+    
+    def save_index(self, filepath: str):
+        """Write the current snapshot; each file is replaced atomically, saves are serialized"""
+        with self._save_lock:
+            # Taken under the lock, so a save that waited never writes an older snapshot
+            kb = self._kb
+            if kb.metadata.live_count == 0:
+                logger.warning("No chunks to save. Skipping index save.")
+                return
             
-            logger.info(f"Index saved to {filepath} ({len(self.chunks)} chunks)")
-        except Exception as e:
-            logger.error(f"Error saving index: {e}")
-            raise
+            index_tmp = f"{filepath}.index.{os.getpid()}.tmp"
+            meta_tmp = f"{filepath}.meta.{os.getpid()}.tmp"
+            try:
+                # Ensure directory exists
+                os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else ".", exist_ok=True)
+                
+                # Rows appended after this snapshot, and deleted rows, are dropped at load
+                with self._index_lock.read():
+                    faiss.write_index(kb.index, index_tmp)
+                
+                referenced = kb.metadata.parent_text_ids()
+                with open(meta_tmp, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'chunks': kb.chunks[:],
+                        'metadata': kb.metadata.to_json(),
+                        'metric': self.metric,
+                        'min_similarity': self.min_similarity,
+                        'auto_threshold': self.auto_threshold,
+                        'texts': {text_id: kb.texts[text_id] for text_id in referenced if text_id in kb.texts}
+                    }, f)
+                
+                # A reader (or a crash) sees the old file or the new one, never a partial write
+                os.replace(index_tmp, f"{filepath}.index")
+                os.replace(meta_tmp, f"{filepath}.meta")
+                logger.info(f"Index saved to {filepath} ({kb.metadata.live_count} chunks)")
+            except Exception as e:
+                logger.error(f"Error saving index: {e}")
+                for tmp in (index_tmp, meta_tmp):
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                raise
     
     def load_index(self, filepath: str):
         """Load FAISS index and metadata"""
         try:
-            self.index = faiss.read_index(f"{filepath}.index")
+            index = faiss.read_index(f"{filepath}.index")
             
             with open(f"{filepath}.meta", 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.chunks = data['chunks']
-                self.metadata = data['metadata']
             
-            logger.info(f"Index loaded from {filepath} ({len(self.chunks)} chunks)")
+            # The saved index decides how scores are interpreted
+            saved_metric = 'cosine' if index.metric_type == faiss.METRIC_INNER_PRODUCT else 'l2'
+            if saved_metric != self.metric:
+                logger.warning(f"Index at {filepath} uses metric '{saved_metric}', not '{self.metric}'")
+                self.metric = saved_metric
+            if self.auto_threshold:
+                # A configured threshold stays fixed; a calibrated one is redone at the next checkpoint
+                self.min_similarity = data.get('min_similarity')
+                self.auto_threshold = data.get('auto_threshold', True)
+            
+            # JSON keys are strings; text ids continue after the largest loaded one
+            texts = {int(text_id): text for text_id, text in data.get('texts', {}).items()}
+            
+            metadata = ChunkTable.from_json(data['metadata']).with_normalized_paths()
+            if index.ntotal < len(metadata) or len(data['chunks']) != len(metadata):
+                raise ValueError(f"Index at {filepath} does not match its metadata")
+            
+            with self._write_lock:
+                if self.deduplicator is not None:
+                    self.deduplicator = MinHashDeduplicator(self.dedup_threshold)
+                    self._dedup_synced = 0
+                kb = KnowledgeBase(index, data['chunks'], metadata, self._kb.version + 1, texts)
+                if index.ntotal > len(metadata) or metadata.deleted:
+                    kb = self._compact(kb)
+                self._kb = kb
+                self._text_ids = itertools.count(max(texts, default=-1) + 1)
+            
+            logger.info(f"Index loaded from {filepath} ({self.chunk_count} chunks)")
         except Exception as e:
             logger.error(f"Error loading index: {e}")
             raise
\ No newline at end of file
@@ -0,0 +1,349 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+import numpy as np
+from loguru import logger
+
+from .document_loader import DocumentLoader
+from .rag_chatbot import RAGChatbot
+
+def _raw_response(status: str, error: str) -> bytes:
+    """Complete HTTP response for rejecting a connection before it is parsed"""
+    body = json.dumps({'error': error}).encode('utf-8')
+    return (f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body
+
+OVERLOADED_RESPONSE = _raw_response("503 Service Unavailable", "Server overloaded")
+CLIENT_LIMIT_RESPONSE = _raw_response("429 Too Many Requests",
+                                      "Too many concurrent requests for this client")
+
+class ServiceMetrics:
+    """Request counters and latency percentiles per endpoint"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, endpoint: str, seconds: float, error: bool = False):
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.latencies[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint] += 1
+
+    def reject(self, reason: str):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, count in self.requests.items():
+                latencies = np.array(self.latencies[endpoint]) * 1000
+                endpoints[endpoint] = {
+                    'requests': count,
+                    'errors': self.errors[endpoint],
+                    'p50_ms': float(np.percentile(latencies, 50)),
+                    'p95_ms': float(np.percentile(latencies, 95))
+                }
+            return {'endpoints': endpoints, 'rejected': dict(self.rejected)}
+
+class RAGService:
+    """Serve one warm RAGChatbot to many HTTP clients through a bounded worker pool"""
+
+    def __init__(self, chatbot: RAGChatbot, max_workers: int = 8, max_queue: int = 64,
+                 per_client_limit: int = 4, index_path: Optional[str] = None,
+                 data_roots: Sequence[str] = ("data/raw",), request_timeout: float = 10.0,
+                 loader: Optional[DocumentLoader] = None):
+        """data_roots bounds which files POST /ingest may read by path; request_timeout
+        bounds each socket read/write so idle connections cannot hold a worker"""
+        self.chatbot = chatbot
+        self.index_path = index_path
+        self.max_workers = max_workers
+        self.per_client_limit = per_client_limit
+        self.data_roots = [Path(root).resolve() for root in data_roots]
+        self.request_timeout = request_timeout
+        self.metrics = ServiceMetrics()
+        self.loader = loader or DocumentLoader()
+        self.draining = False
+
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="rag-worker")
+        self._admission = threading.BoundedSemaphore(max_workers + max_queue)
+        self._clients_lock = threading.Lock()
+        self._client_inflight = defaultdict(int)
+        self._pending = 0
+
+    # Admission control
+
+    def try_admit(self) -> bool:
+        """Reserve a worker or queue slot; False when the queue is full or draining"""
+        if self.draining or not self._admission.acquire(blocking=False):
+            return False
+        with self._clients_lock:
+            self._pending += 1
+        return True
+
+    def release(self):
+        with self._clients_lock:
+            self._pending -= 1
+        self._admission.release()
+
+    def acquire_client(self, client: str) -> bool:
+        with self._clients_lock:
+            if self._client_inflight[client] >= self.per_client_limit:
+                return False
+            self._client_inflight[client] += 1
+            return True
+
+    def release_client(self, client: str):
+        with self._clients_lock:
+            self._client_inflight[client] -= 1
+            if self._client_inflight[client] == 0:
+                del self._client_inflight[client]
+
+    def submit(self, fn, *args):
+        return self._executor.submit(fn, *args)
+
+    # Endpoints
+
+    def health(self) -> Dict:
+        return {
+            'status': 'draining' if self.draining else 'ok',
+            'chunks': self.chatbot.chunk_count
+        }
+
+    def stats(self) -> Dict:
+        stats = self.metrics.snapshot()
+        with self._clients_lock:
+            stats['pending'] = self._pending
+            stats['clients'] = len(self._client_inflight)
+        stats['workers'] = self.max_workers
+        stats['chunks'] = self.chatbot.chunk_count
+        stats['dedup'] = dict(self.chatbot.dedup_stats)
+        stats['llm'] = self.chatbot.router.stats()
+        stats['single_flight'] = self.chatbot.single_flight.stats()
+        return stats
+
+    def memory(self) -> Dict:
+        return {'bytes': self.chatbot.memory_usage(), 'chunks': self.chatbot.chunk_count}
+
+    @staticmethod
+    def _top_k(body: Dict) -> int:
+        top_k = int(body.get('top_k', 3))
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        return top_k
+
+    def retrieve(self, body: Dict) -> Dict:
+        results = self.chatbot.retrieve(body['query'], self._top_k(body))
+        return {'results': [
+            {'text': chunk, 'metadata': meta, 'relevance_score': score}
+            for chunk, meta, score in results
+        ]}
+
+    def chat(self, body: Dict) -> Dict:
+        return self.chatbot.chat(
+            body['query'],
+            top_k=self._top_k(body),
+            show_sources=bool(body.get('show_sources', True))
+        )
+
+    def chat_stream(self, body: Dict):
+        return self.chatbot.chat_stream(
+            body['query'],
+            top_k=self._top_k(body),
+            show_sources=bool(body.get('show_sources', True))
+        )
+
+    def _resolve_ingest_path(self, path: str) -> Path:
+        """Resolved path, if it lies under one of the data roots"""
+        resolved = Path(path).resolve()
+        if not any(os.path.commonpath([resolved, root]) == str(root) for root in self.data_roots):
+            raise ValueError(f"{path} is outside the data directories")
+        return resolved
+
+    def ingest(self, body: Dict) -> Dict:
+        # Text documents never carry a path: with replace=True it would let a caller
+        # drop or overwrite the chunks of any indexed file
+        documents = [{key: value for key, value in doc.items() if key != 'path'}
+                     for doc in body.get('documents', [])]
+        # Check every path before reading any, so a bad request indexes nothing
+        paths = [self._resolve_ingest_path(path) for path in body.get('paths', [])]
+        for path in paths:
+            doc = self.loader.load_file(path)
+            if doc:
+                documents.append(doc)
+        if not documents:
+            return {'added_documents': 0, 'chunks': self.chatbot.chunk_count}
+
+        # Searches keep using the previous snapshot until add_documents publishes
+        self.chatbot.add_documents(documents, replace=True)
+        if self.index_path:
+            self.chatbot.save_index(self.index_path)
+        return {'added_documents': len(documents), 'chunks': self.chatbot.chunk_count}
+
+    def shutdown(self):
+        """Stop admitting requests and wait for queued and in-flight ones to finish"""
+        self.draining = True
+        self._executor.shutdown(wait=True)
+        logger.info("RAG service drained")
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Route HTTP requests to RAGService endpoints"""
+
+    service: RAGService = None
+
+    GET_ROUTES = {'/health': 'health', '/metrics': 'stats', '/memory': 'memory'}
+    POST_ROUTES = {'/retrieve': 'retrieve', '/chat': 'chat', '/ingest': 'ingest'}
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _dispatch(self, endpoint: str, handler):
+        start = time.perf_counter()
+        error = False
+        self._streaming = False
+        try:
+            handler()
+        except (KeyError, ValueError) as e:
+            error = True
+            self._send_error(400, f"Bad request: {e}")
+        except Exception as e:
+            error = True
+            logger.error(f"Error handling {endpoint}: {e}")
+            self._send_error(500, str(e))
+        finally:
+            self.service.metrics.record(endpoint, time.perf_counter() - start, error)
+
+    def _send_error(self, status: int, message: str):
+        if not self._streaming:
+            self._send_json(status, {'error': message})
+            return
+        # Headers and part of the event stream are already out; end it with an error event
+        try:
+            self._write_event({'type': 'error', 'error': message})
+        except OSError:
+            pass
+
+    def do_GET(self):
+        method = self.GET_ROUTES.get(self.path)
+        if method is None:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        status = 503 if self.service.draining and method == 'health' else 200
+        self._dispatch(self.path, lambda: self._send_json(status, getattr(self.service, method)()))
+
+    def do_POST(self):
+        if self.path == '/chat/stream':
+            self._dispatch(self.path, self._stream_chat)
+            return
+
+        method = self.POST_ROUTES.get(self.path)
+        if method is None:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        self._dispatch(self.path, lambda: self._send_json(
+            200, getattr(self.service, method)(self._read_json())))
+
+    def _stream_chat(self):
+        events = self.service.chat_stream(self._read_json())
+        first = next(events)  # surface request errors before headers are sent
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self._streaming = True
+        self._write_event(first)
+        for event in events:
+            self._write_event(event)
+
+    def _write_event(self, event: Dict):
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands connections to the service's bounded worker pool"""
+
+    daemon_threads = True
+
+    def __init__(self, address, service: RAGService):
+        handler = type('BoundRAGRequestHandler', (RAGRequestHandler,),
+                       {'service': service, 'timeout': service.request_timeout})
+        super().__init__(address, handler)
+        self.service = service
+
+    def process_request(self, request, client_address):
+        # Checked per connection before it is queued, so one client's idle or slow
+        # connections cannot occupy every worker
+        client = client_address[0]
+        if not self.service.acquire_client(client):
+            self.service.metrics.reject('client_limit')
+            self._reject(request, CLIENT_LIMIT_RESPONSE)
+            return
+        if not self.service.try_admit():
+            self.service.release_client(client)
+            self.service.metrics.reject('queue_full')
+            self._reject(request, OVERLOADED_RESPONSE)
+            return
+        self.service.submit(self._process, request, client_address)
+
+    def _reject(self, request, response: bytes):
+        try:
+            request.sendall(response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.service.release_client(client_address[0])
+            self.service.release()
+
+def serve(chatbot: RAGChatbot, host: str = "127.0.0.1", port: int = 8000, **service_kwargs):
+    """Run the service until interrupted, then drain in-flight requests"""
+    import signal
+
+    service = RAGService(chatbot, **service_kwargs)
+    server = PooledHTTPServer((host, port), service)
+
+    def _stop(signum, frame):
+        logger.info("Shutting down RAG service...")
+        service.draining = True
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    logger.info(f"RAG service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        service.shutdown()
+        server.server_close()
@@ -0,0 +1,111 @@
+import threading
+from typing import Callable, Dict, Hashable, Iterator
+
+class _Call:
+    """Result slot shared by the leader and its followers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _StreamCall:
+    """Buffered stream that any number of subscribers can replay from the start"""
+
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def produce(self, fn: Callable[[], Iterator]):
+        try:
+            for item in fn():
+                with self.cond:
+                    self.items.append(item)
+                    self.cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.cond:
+                self.finished = True
+                self.cond.notify_all()
+
+    def subscribe(self) -> Iterator:
+        position = 0
+        while True:
+            with self.cond:
+                while position >= len(self.items) and not self.finished:
+                    self.cond.wait()
+                if position < len(self.items):
+                    item = self.items[position]
+                    position += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield item
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one execution
+
+    Only calls that overlap in time share work; once a call finishes its key is
+    forgotten, so nothing is served stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _StreamCall] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        """Run fn once per key among concurrent callers; all receive its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterator]) -> Iterator:
+        """Fan out one producer's items to every concurrent subscriber of key"""
+        with self._lock:
+            call = self._streams.get(key)
+            if call is None:
+                call = self._streams[key] = _StreamCall()
+                self.executions += 1
+                # Produce on a thread so one slow or abandoned reader stalls nobody
+                threading.Thread(target=self._produce, args=(key, call, fn), daemon=True).start()
+            else:
+                self.coalesced += 1
+        return call.subscribe()
+
+    def _produce(self, key: Hashable, call: _StreamCall, fn: Callable[[], Iterator]):
+        try:
+            call.produce(fn)
+        finally:
+            with self._lock:
+                del self._streams[key]
+
+    def stats(self) -> Dict:
+        return {'executions': self.executions, 'coalesced': self.coalesced}
@@ -0,0 +1,289 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from .document_loader import DocumentLoader
+from .metadata import normalize_path
+from .rag_chatbot import RAGChatbot
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+class DirectoryWatcher:
+    """Keep the index in step with files created, modified or deleted under roots
+
+    Uses inotify (via watchdog) when available and falls back to polling file
+    stats. Events are debounced per path, so an editor's burst of writes
+    becomes one re-index, and only the files that changed are parsed. Each
+    batch is published as one snapshot; the index is saved at most once per
+    save_interval, and again on stop.
+    """
+
+    def __init__(self, chatbot: RAGChatbot, roots: List[str], loader: Optional[DocumentLoader] = None,
+                 debounce: float = 1.0, max_concurrency: int = 4, batch_files: int = 32,
+                 index_path: Optional[str] = None, poll_interval: float = 2.0,
+                 use_inotify: bool = True, save_interval: float = 30.0):
+        self.chatbot = chatbot
+        # Paths are tracked, and indexed, in normalize_path form
+        self.roots = [Path(normalize_path(root)) for root in roots]
+        self.loader = loader or DocumentLoader()
+        self.debounce = debounce
+        self.max_concurrency = max_concurrency
+        self.batch_files = batch_files
+        self.index_path = index_path
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.save_interval = save_interval
+        # Chunks indexed; files removed, or skipped as unchanged
+        self.stats = {'indexed': 0, 'removed': 0, 'skipped': 0, 'batches': 0}
+
+        # path -> (deleted, time of the latest event); flushed once quiet for `debounce`
+        self._pending: Dict[str, Tuple[bool, float]] = {}
+        # path -> (mtime_ns, size) of the version currently in the index
+        self._indexed: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._observer = None
+        self._unsaved = False
+        self._last_save = time.monotonic()
+
+    def _wanted(self, path: Path) -> bool:
+        # Skip editor swap files and Office lock files
+        return (path.suffix.lower() in self.loader.supported_formats
+                and not path.name.startswith(('.', '~$')))
+
+    @staticmethod
+    def _fingerprint(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _scan(self, root: Path) -> Dict[str, Tuple[int, int]]:
+        """Fingerprints of every wanted file under root (stat only, nothing is read)"""
+        found = {}
+        stack = [str(root)]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and self._wanted(Path(entry.path)):
+                        st = entry.stat()
+                        found[entry.path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+        return found
+
+    def notify(self, path: str, deleted: bool = False):
+        """Record a change; the file is processed once events for it go quiet"""
+        if not self._wanted(Path(path)):
+            return
+        path = normalize_path(path)
+        with self._lock:
+            self._pending[path] = (deleted, time.monotonic())
+
+    def _notify_tree(self, root: str, deleted: bool):
+        """A whole directory appeared, vanished or moved"""
+        if deleted:
+            prefix = normalize_path(root).rstrip(os.sep) + os.sep
+            with self._lock:
+                known = [path for path in self._indexed if path.startswith(prefix)]
+            for path in known:
+                self.notify(path, deleted=True)
+        else:
+            for path in self._scan(Path(root)):
+                self.notify(path)
+
+    def dispatch(self, event):
+        """watchdog event handler"""
+        kind = event.event_type
+        if kind not in ('created', 'modified', 'closed', 'deleted', 'moved'):
+            return
+        src = os.fsdecode(event.src_path)
+        if event.is_directory:
+            if kind in ('deleted', 'moved'):
+                self._notify_tree(src, deleted=True)
+            if kind in ('created', 'moved'):
+                self._notify_tree(os.fsdecode(getattr(event, 'dest_path', '') or src), deleted=False)
+            return
+        if kind == 'moved':
+            self.notify(src, deleted=True)
+            self.notify(os.fsdecode(event.dest_path))
+        else:
+            self.notify(src, deleted=kind == 'deleted')
+
+    def _under_roots(self, path: str) -> bool:
+        return any(path.startswith(str(root).rstrip(os.sep) + os.sep) for root in self.roots)
+
+    def _bootstrap(self):
+        """Queue files that are missing from, newer than, or gone since the loaded index"""
+        index_mtime = 0
+        if self.index_path and os.path.exists(f"{self.index_path}.index"):
+            index_mtime = os.stat(f"{self.index_path}.index").st_mtime_ns
+
+        indexed_paths = self.chatbot.metadata.paths()
+        indexed_names = self.chatbot.metadata.unpathed_sources()
+        scanned = {}
+        for root in self.roots:
+            scanned.update(self._scan(root))
+        queued = 0
+        for path, fingerprint in scanned.items():
+            known = path in indexed_paths or Path(path).name in indexed_names
+            if known and fingerprint[0] <= index_mtime:
+                with self._lock:
+                    self._indexed[path] = fingerprint
+            else:
+                self.notify(path)
+                queued += 1
+
+        # Indexed, then deleted while nothing was watching
+        gone = [path for path in indexed_paths - scanned.keys() if self._under_roots(path)]
+        if self.roots:
+            # Chunks saved without a path can only be matched by file name
+            names = {Path(path).name for path in scanned}
+            gone += [str(self.roots[0] / name) for name in indexed_names - names]
+        with self._lock:
+            for path in gone:
+                # No file has this fingerprint, so _apply removes the path
+                self._indexed[path] = (0, 0)
+        for path in gone:
+            self.notify(path, deleted=True)
+        logger.info(f"Watcher: {len(scanned) - queued} files current, {queued} queued, "
+                    f"{len(gone)} deleted since the index was saved")
+
+    def start(self):
+        """Index anything new since the last save, then follow changes"""
+        self._bootstrap()
+
+        if self.use_inotify and Observer is not None:
+            try:
+                observer = Observer()
+                for root in self.roots:
+                    observer.schedule(self, str(root), recursive=True)
+                observer.start()
+                self._observer = observer
+                logger.info(f"Watching {len(self.roots)} directories with {type(observer).__name__}")
+            except OSError as e:
+                # e.g. inotify watch limit reached
+                logger.warning(f"Native file events unavailable ({e}); polling instead")
+        if self._observer is None:
+            self._spawn(self._poll, "watcher-poll")
+            logger.info(f"Polling {len(self.roots)} directories every {self.poll_interval}s")
+
+        self._spawn(self._flush_loop, "watcher-flush")
+
+    def _spawn(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _poll(self):
+        previous = {}
+        for root in self.roots:
+            previous.update(self._scan(root))
+        while not self._stop.wait(self.poll_interval):
+            current = {}
+            for root in self.roots:
+                current.update(self._scan(root))
+            for path, fingerprint in current.items():
+                if previous.get(path) != fingerprint:
+                    self.notify(path)
+            for path in previous.keys() - current.keys():
+                self.notify(path, deleted=True)
+            previous = current
+
+    def _take_ready(self) -> List[Tuple[str, bool]]:
+        """Pop up to batch_files paths whose last event is older than the debounce"""
+        cutoff = time.monotonic() - self.debounce
+        with self._lock:
+            ready = [path for path, (_, at) in self._pending.items() if at <= cutoff]
+            ready = ready[:self.batch_files]
+            return [(path, self._pending.pop(path)[0]) for path in ready]
+
+    def _flush_loop(self):
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix="watcher-parse") as executor:
+            while not self._stop.wait(min(self.debounce / 2, 0.5)):
+                ready = self._take_ready()
+                if ready:
+                    try:
+                        self._apply(ready, executor)
+                    except Exception as e:
+                        logger.error(f"Watcher batch failed: {e}")
+                if self._unsaved and time.monotonic() - self._last_save >= self.save_interval:
+                    self._checkpoint()
+        if self._unsaved:
+            self._checkpoint()
+
+    def _apply(self, ready: List[Tuple[str, bool]], executor: ThreadPoolExecutor):
+        removed = []
+        changed = []
+        for path, deleted in ready:
+            fingerprint = None if deleted else self._fingerprint(path)
+            if fingerprint is None:
+                if path in self._indexed:
+                    removed.append(path)
+            elif self._indexed.get(path) == fingerprint:
+                # Touched or re-saved without changes
+                self.stats['skipped'] += 1
+            else:
+                changed.append((path, fingerprint))
+
+        if not removed and not changed:
+            return
+
+        docs = []
+        if changed:
+            # Parsing is the slow part; embedding happens once for the whole batch
+            docs = list(executor.map(lambda item: self.loader.load_file(Path(item[0])), changed))
+        loaded = [doc for doc in docs if doc]
+        # Files that no longer yield text must not keep their old chunks
+        empty = [path for (path, _), doc in zip(changed, docs) if not doc]
+
+        # Deletions, replacements and additions are published as one snapshot
+        self.stats['indexed'] += self.chatbot.add_documents(loaded, replace=True, remove=removed + empty)
+        self.stats['removed'] += len(removed) + len(empty)
+        with self._lock:
+            for path in removed:
+                self._indexed.pop(path, None)
+            for path, fingerprint in changed:
+                self._indexed[path] = fingerprint
+
+        self.stats['batches'] += 1
+        self._unsaved = True
+        logger.info(f"Watcher: {len(changed)} changed, {len(removed)} deleted; "
+                    f"{self.chatbot.chunk_count} chunks in knowledge base")
+
+    def _checkpoint(self):
+        """Recalibrate and save once for every batch applied since the last save"""
+        self._unsaved = False
+        self._last_save = time.monotonic()
+        chatbot = self.chatbot
+        try:
+            chatbot.auto_calibrate()
+            if self.index_path:
+                chatbot.save_index(self.index_path)
+        except Exception as e:
+            logger.error(f"Watcher save failed: {e}")
+
+    def stop(self):
+        """Stop following changes and save; events still waiting on the debounce are dropped"""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,53 @@
+import zlib
+import numpy as np
+import pytest
+from loguru import logger
+
+class HashingEmbedder:
+    """Bag-of-words vectors hashed into a few dimensions; stands in for the model"""
+
+    def __init__(self, embedding_dim: int = 32):
+        self.embedding_dim = embedding_dim
+        self.model = None
+        self.pool = None
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.embedding_dim, dtype='float32')
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % self.embedding_dim] += 1.0
+        return vector
+
+    def embed_texts(self, texts, batch_size: int = 32) -> np.ndarray:
+        return np.array([self._embed(t) for t in texts], dtype='float32').reshape(-1, self.embedding_dim)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self.embed_texts([query])
+
+    def close(self):
+        pass
+
+WORDS = ('alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi '
+         'omicron pi rho sigma tau upsilon phi chi psi omega').split()
+
+def make_document(i: int, words: int = 120, root: str = '/corpus') -> dict:
+    """Random-word document whose text names it, so chunks can be traced to their file"""
+    rng = np.random.default_rng(i)
+    text = ' '.join(f"doc{i} {' '.join(rng.choice(WORDS, 9))}" for _ in range(words // 10))
+    return {'text': text, 'source': f'doc{i}.txt', 'path': f'{root}/doc{i}.txt'}
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logger.disable('src')
+    yield
+    logger.enable('src')
+
+@pytest.fixture
+def make_chatbot():
+    from src.rag_chatbot import RAGChatbot
+
+    def build(**kwargs):
+        kwargs.setdefault('chunk_size', 40)
+        kwargs.setdefault('chunk_overlap', 5)
+        return RAGChatbot(nvidia_api_key='', nvidia_api_url='http://localhost/unused',
+                          embedder=HashingEmbedder(), **kwargs)
+    return build
@@ -0,0 +1,128 @@
+import json
+import random
+import threading
+from pathlib import Path
+from src.metadata import normalize_path
+from tests.conftest import WORDS, make_document
+
+def tagged_document(i: int, generation: int = 0) -> dict:
+    """Every word carries the file and generation, so a chunk names the text it came from"""
+    rng = random.Random(i * 1000 + generation)
+    text = ' '.join(f"d{i}g{generation}_{rng.choice(WORDS)}" for _ in range(30 + generation))
+    return {'text': text, 'source': f'doc{i}.txt', 'path': f'/corpus/doc{i}.txt'}
+
+GENERATIONS = 40
+# Every text each file has had, by source
+VERSIONS = {f'doc{i}.txt': [tagged_document(i, g)['text'] for g in range(GENERATIONS)] for i in range(20)}
+
+def from_source(chunk: str, meta: dict) -> bool:
+    return any(chunk in text for text in VERSIONS[meta['source']])
+
+def assert_parents_frame_chunks(chatbot):
+    kb = chatbot._kb
+    for row, meta in enumerate(kb.metadata):
+        parent = meta['parent']
+        assert kb.chunks[row] in kb.texts[parent['text_id']][parent['start']:parent['end']]
+
+def test_retrieve_during_replace_sees_consistent_rows(make_chatbot):
+    chatbot = make_chatbot()
+    chatbot.add_documents([tagged_document(i) for i in range(20)])
+    stop = threading.Event()
+    mismatches, errors = [], []
+
+    def reader():
+        rng = random.Random()
+        while not stop.is_set():
+            try:
+                query = f"d{rng.randrange(20)}g0_{rng.choice(WORDS)}"
+                for chunk, meta, _ in chatbot.retrieve(query, top_k=5):
+                    if not from_source(chunk, meta):
+                        mismatches.append((chunk, meta))
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for generation in range(1, GENERATIONS):
+            batch = random.Random(generation).sample(range(20), 3)
+            chatbot.add_documents([tagged_document(i, generation) for i in batch], replace=True)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+    assert not errors
+    assert not mismatches
+    kb = chatbot._kb
+    live = [row for row in range(len(kb.metadata)) if row not in kb.metadata.deleted]
+    assert all(from_source(kb.chunks[row], kb.metadata[row]) for row in live)
+    assert chatbot.metadata.paths() == {f'/corpus/doc{i}.txt' for i in range(20)}
+
+def test_compaction_renumbers_dedup_signatures_and_texts(make_chatbot):
+    chatbot = make_chatbot(dedup=True, parent_chunk_size=80)
+    chatbot.add_documents([make_document(i) for i in range(12)])
+    removed = chatbot.remove_documents([f'/corpus/doc{i}.txt' for i in range(6)])
+    assert removed > 0
+
+    # More than a quarter of the rows were deleted, so the index was rebuilt
+    assert not chatbot.metadata.deleted
+    assert len(chatbot.chunks) == chatbot.chunk_count == chatbot.index.ntotal
+    assert chatbot.metadata.sources() == [f'doc{i}.txt' for i in (10, 11, 6, 7, 8, 9)]
+
+    # Only texts of surviving documents are kept, and they still frame their chunks
+    assert set(chatbot._kb.texts) == chatbot.metadata.parent_text_ids()
+    assert_parents_frame_chunks(chatbot)
+
+    # A copy of a surviving file collapses onto that file's renumbered rows
+    before = chatbot.chunk_count
+    copy = dict(make_document(8), source='copy8.txt', path='/elsewhere/copy8.txt')
+    assert chatbot.add_documents([copy]) == 0
+    assert chatbot.chunk_count == before
+    holders = {meta['source'] for meta in chatbot.metadata
+               if any(ref['source'] == 'copy8.txt' for ref in meta.get('duplicates', []))}
+    assert holders == {'doc8.txt'}
+
+def test_save_load_round_trip(make_chatbot, tmp_path):
+    chatbot = make_chatbot(parent_chunk_size=80)
+    chatbot.add_documents([make_document(i) for i in range(8)])
+    chatbot.add_documents([make_document(3, words=40)], replace=True)
+    assert chatbot.metadata.deleted
+    chatbot.save_index(str(tmp_path / 'index'))
+
+    loaded = make_chatbot(parent_chunk_size=80)
+    loaded.load_index(str(tmp_path / 'index'))
+    assert not loaded.metadata.deleted
+    live = [row for row in range(len(chatbot.metadata)) if row not in chatbot.metadata.deleted]
+    assert loaded.chunks[:] == [chatbot.chunks[row] for row in live]
+    assert list(loaded.metadata) == [chatbot.metadata[row] for row in live]
+    assert loaded._kb.texts == {text_id: text for text_id, text in chatbot._kb.texts.items()
+                                if text_id in loaded.metadata.parent_text_ids()}
+
+    query = make_document(5)['text'][:80]
+    assert loaded.retrieve(query, 4) == chatbot.retrieve(query, 4)
+    # New text ids continue after the loaded ones instead of overwriting them
+    loaded.add_documents([make_document(20)])
+    assert 'doc20.txt' in loaded.metadata.sources()
+    assert_parents_frame_chunks(loaded)
+
+def test_load_legacy_metadata_list(make_chatbot, tmp_path):
+    chatbot = make_chatbot()
+    documents = [dict(make_document(i), path=f'corpus/doc{i}.txt') for i in range(4)]
+    chatbot.add_documents(documents)
+    chatbot.save_index(str(tmp_path / 'index'))
+
+    # Indexes saved before the columnar table held one dict per chunk and no texts
+    meta_file = tmp_path / 'index.meta'
+    data = json.loads(meta_file.read_text())
+    rows = [dict(meta, path=documents[meta['doc_id']]['path']) for meta in chatbot.metadata]
+    meta_file.write_text(json.dumps({'chunks': data['chunks'], 'metadata': rows}))
+
+    loaded = make_chatbot()
+    loaded.load_index(str(tmp_path / 'index'))
+    assert loaded.chunks[:] == chatbot.chunks[:]
+    assert [meta['path'] for meta in loaded.metadata] == [
+        str(Path(meta['path']).resolve()) for meta in rows]
+    assert loaded.remove_documents([normalize_path('corpus/doc2.txt')]) > 0
+    assert 'doc2.txt' not in loaded.metadata.sources()
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.llm_router import LLMEndpoint, LLMRouter, LLMUnavailableError, parse_endpoints
+
+class FakeCompletions(ThreadingHTTPServer):
+    """Chat completions server answering with fixed tokens after a delay, or an error status"""
+
+    daemon_threads = True
+
+    def __init__(self, tokens=('Hello', ' world'), delay: float = 0.0, status: int = 200):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.status = status
+        self.hits = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        server.hits += 1
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(server.delay)
+        if server.status != 200:
+            self.send_error(server.status)
+            return
+        self.send_response(200)
+        if payload.get('stream'):
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for token in server.tokens:
+                chunk = {'choices': [{'delta': {'content': token}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+        else:
+            body = json.dumps({'choices': [{'message': {'content': ''.join(server.tokens)}}]}).encode()
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = FakeCompletions(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+PAYLOAD = {'messages': [{'role': 'user', 'content': 'hi'}]}
+
+def test_complete_and_stream(servers):
+    server = servers(tokens=['Hel', 'lo'])
+    endpoint = LLMEndpoint(server.url, 'model-a')
+    router = LLMRouter([endpoint])
+    assert router.complete(PAYLOAD) == 'Hello'
+    assert list(router.stream(PAYLOAD)) == ['Hel', 'lo']
+    assert endpoint.stats()['requests'] == 2
+    assert endpoint.ewma_latency is not None
+
+def test_fails_over_to_next_endpoint(servers):
+    broken, healthy = servers(status=500), servers(tokens=['ok'])
+    first = LLMEndpoint(broken.url, 'model-a')
+    router = LLMRouter([first, LLMEndpoint(healthy.url, 'model-b')])
+    assert router.complete(PAYLOAD) == 'ok'
+    assert broken.hits == 1 and healthy.hits == 1
+    assert first.error_rate > 0
+
+def test_circuit_opens_after_repeated_failures(servers):
+    broken, healthy = servers(status=503), servers(tokens=['ok'])
+    first = LLMEndpoint(broken.url, 'model-a', failure_threshold=2, cooldown=60)
+    second = LLMEndpoint(healthy.url, 'model-b')
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            LLMRouter([first]).complete(PAYLOAD)
+    assert first.stats()['circuit_open']
+
+    router = LLMRouter([first, second])
+    assert router.rank() == [second]
+    assert router.complete(PAYLOAD) == 'ok'
+    assert broken.hits == 2
+
+def test_all_endpoints_failing_raises(servers):
+    router = LLMRouter([LLMEndpoint(servers(status=500).url, 'a'), LLMEndpoint(servers(status=502).url, 'b')])
+    with pytest.raises(LLMUnavailableError):
+        router.complete(PAYLOAD)
+
+def test_rank_prefers_low_latency_and_penalizes_errors():
+    fast, slow, flaky = (LLMEndpoint(f'http://{name}', name) for name in ('fast', 'slow', 'flaky'))
+    for _ in range(5):
+        fast.record_success(0.05)
+        slow.record_success(0.5)
+        flaky.record_success(0.04)
+    flaky.record_failure()
+    flaky.record_failure()
+    router = LLMRouter([slow, flaky, fast])
+    assert router.rank() == [fast, flaky, slow]
+
+def test_hedge_races_a_slow_primary(servers):
+    slow, fast = servers(tokens=['slow'], delay=1.0), servers(tokens=['fast'])
+    primary, secondary = LLMEndpoint(slow.url, 'model-a'), LLMEndpoint(fast.url, 'model-b')
+    # Untried endpoints are assumed as slow as the slowest seen, so the slow one goes first
+    secondary.record_success(0.5)
+    router = LLMRouter([primary, secondary], hedge=True, default_hedge_delay=0.05)
+
+    start = time.perf_counter()
+    assert list(router.stream(PAYLOAD)) == ['fast']
+    assert time.perf_counter() - start < 0.8
+    assert router.stats()['hedged_requests'] == 1
+    assert router.stats()['hedge_wins'] == 1
+    # The loser is charged at least the time it was given
+    assert primary.ewma_latency >= 0.05
+
+def test_parse_endpoints_applies_default_key():
+    spec = json.dumps([{'url': 'http://a', 'model': 'm1'}, {'url': 'http://b', 'model': 'm2', 'api_key': 'k2'}])
+    endpoints = parse_endpoints(spec, default_api_key='k')
+    assert [(ep.url, ep.model, ep.api_key) for ep in endpoints] == [('http://a', 'm1', 'k'), ('http://b', 'm2', 'k2')]
+    assert parse_endpoints([{'url': 'http://c', 'model': 'm3'}])[0].name == 'm3@http://c'
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pytest
+from src.chunking import TextChunker
+from src.memory import plan_capacity
+from tests.conftest import make_document
+
+TOLERANCE = 0.15
+
+def corpus(count: int = 300):
+    return [make_document(i, words=80 + 40 * (i % 5)) for i in range(count)]
+
+def plan_for(documents, chunk_size, chunk_overlap, parent_chunk_size=None):
+    tokenizer = TextChunker(chunk_size, chunk_overlap).tokenizer
+    tokens = [len(tokenizer.encode(doc['text'])) for doc in documents]
+    return plan_capacity(
+        tokens, chunk_size=chunk_size, chunk_overlap=chunk_overlap, embedding_dim=32,
+        parent_chunk_size=parent_chunk_size,
+        chars_per_token=sum(len(doc['text']) for doc in documents) / sum(tokens),
+        avg_source_chars=int(np.mean([len(doc['source']) for doc in documents])),
+        avg_path_chars=int(np.mean([len(doc['path']) for doc in documents])))
+
+def assert_close(planned, measured, name):
+    error = (planned - measured) / measured
+    assert abs(error) <= TOLERANCE, f"{name}: planned {planned:,} vs measured {measured:,} ({error:+.1%})"
+
+@pytest.mark.parametrize('parent_chunk_size', [None, 120])
+def test_plan_matches_built_index(make_chatbot, tmp_path, parent_chunk_size):
+    documents = corpus()
+    plan = plan_for(documents, 40, 5, parent_chunk_size)
+    chatbot = make_chatbot(chunk_size=40, chunk_overlap=5, parent_chunk_size=parent_chunk_size)
+    chatbot.add_documents(documents)
+
+    # Parent sections are planned as equal splits, so chunk counts are estimates too
+    assert_close(plan['indexed_chunks'], chatbot.chunk_count, 'chunks')
+    measured = chatbot.memory_usage()
+    for name in ('index', 'chunks', 'metadata', 'texts'):
+        if plan['ram_bytes'][name]:
+            assert_close(plan['ram_bytes'][name], measured[name], name)
+    assert_close(plan['ram_bytes']['total'] - plan['ram_bytes']['model'],
+                 measured['total'] - measured['model'], 'ram')
+
+    chatbot.save_index(str(tmp_path / 'index'))
+    disk = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert_close(plan['disk_bytes']['total'], disk, 'disk')
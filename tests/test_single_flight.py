@@ -0,0 +1,98 @@
+import threading
+import pytest
+from src.single_flight import SingleFlight
+
+def run_concurrently(count, target):
+    """Start count threads on target together; return their results in order"""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return {'answer': 42}
+
+    def call():
+        return flight.do('key', slow)
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results = run_concurrently(8, call)
+    timer.join()
+
+    assert len(calls) == 1
+    assert all(result == {'answer': 42} for result in results)
+    assert flight.stats() == {'executions': 1, 'coalesced': 7}
+
+def test_finished_keys_are_forgotten():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do('key', lambda: next(counter)) == 0
+    assert flight.do('key', lambda: next(counter)) == 1
+    assert flight.do('other', lambda: next(counter)) == 2
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('backend down')
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results = run_concurrently(4, lambda: flight.do('key', failing))
+    timer.join()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+
+def test_stream_replays_every_item_to_each_subscriber():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def tokens():
+        yield 'a'
+        release.wait(5)
+        yield 'b'
+        yield 'c'
+
+    first = flight.stream('key', tokens)
+    assert next(first) == 'a'
+    # Joins mid-stream, and still sees the items it missed
+    second = flight.stream('key', tokens)
+    release.set()
+    assert list(first) == ['b', 'c']
+    assert list(second) == ['a', 'b', 'c']
+    assert flight.stats() == {'executions': 1, 'coalesced': 1}
+
+def test_stream_error_is_raised_after_buffered_items():
+    flight = SingleFlight()
+
+    def broken():
+        yield 'partial'
+        raise RuntimeError('stream cut')
+
+    subscriber = flight.stream('key', broken)
+    assert next(subscriber) == 'partial'
+    with pytest.raises(RuntimeError, match='stream cut'):
+        next(subscriber)